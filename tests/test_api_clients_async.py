@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+import pytest
+
+from valutatrade_hub.parser_service.api_clients import (
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+)
+from valutatrade_hub.parser_service.api_clients.abc import (
+    ApiHTTPError,
+)
+from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.models.rate import RatesType
+from valutatrade_hub.parser_service.stub_server import (
+    EXCHANGERATE_PATH,
+    ProviderStubServer,
+    StubSettings,
+)
+
+pytest.importorskip("aiohttp")
+
+#: задержка ответа заглушки (в миллисекундах)
+LATENCY_MS = 200
+FIAT_CURRENCIES = ["EUR", "GBP", "RUB", "JPY"]
+
+
+@pytest.fixture
+def stub():
+    server = ProviderStubServer(StubSettings(latency_ms=LATENCY_MS, seed=1))
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_config(tmp_path, stub, **params) -> ParserConfig:
+    data = {
+        "exchangerate_api_key": "key",
+        "data_path": str(tmp_path),
+        "coingecko_url": stub.coingecko_url,
+        "exchangerate_api_url": stub.exchangerate_api_url,
+        "fiat_currencies": FIAT_CURRENCIES,
+        "retry_backoff_factor": 0,
+        "retry_backoff_jitter": 0,
+    } | params
+    path = tmp_path / "parser.json"
+    path.write_text(json.dumps(data))
+    config = ParserConfig(path)
+    config.load()
+    return config
+
+
+def rate_values(rates: RatesType) -> dict:
+    return {key: rate.rate for key, rate in rates.items()}
+
+
+def exchangerate_requests(stub: ProviderStubServer) -> list[int]:
+    """
+    :return: количество запросов к каждому url ExchangeRate-API.
+    """
+    return [
+        sum(statuses.values()) for path, statuses in stub.stats.items()
+        if path.startswith(EXCHANGERATE_PATH)
+    ]
+
+
+@pytest.fixture
+def no_threads(monkeypatch):
+    """
+    Асинхронные запросы не должны занимать потоки.
+    """
+    def to_thread(*args, **kwargs):
+        raise AssertionError("asyncio.to_thread is called")
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+
+
+def test_exchange_rate_requests_are_concurrent(tmp_path, stub, no_threads):
+    client = ExchangeRateApiClient(make_config(tmp_path, stub))
+    start = time.monotonic()
+    rates = asyncio.run(client.fetch_rates_async())
+    elapsed = time.monotonic() - start
+    assert client.requests_per_fetch == len(FIAT_CURRENCIES) + 1
+    assert elapsed < client.requests_per_fetch * LATENCY_MS / 1000 / 2
+    assert rate_values(rates) == rate_values(client.fetch_rates())
+
+
+def test_conditional_requests(tmp_path, stub, no_threads):
+    client = ExchangeRateApiClient(make_config(tmp_path, stub))
+    first = asyncio.run(client.fetch_rates_async())
+    second = asyncio.run(client.fetch_rates_async())
+    assert second.keys() == first.keys()
+    statuses = {
+        path: counts for path, counts in stub.stats.items()
+        if path.startswith(EXCHANGERATE_PATH)
+    }
+    assert statuses
+    for counts in statuses.values():
+        assert counts == {HTTPStatus.OK: 1, HTTPStatus.NOT_MODIFIED: 1}
+
+
+def test_coingecko_batches(tmp_path, stub, no_threads):
+    client = CoinGeckoClient(
+        make_config(tmp_path, stub, coingecko_batch_size=1)
+    )
+    rates = asyncio.run(client.fetch_rates_async())
+    assert client.requests_per_fetch > 1
+    assert rate_values(rates) == rate_values(client.fetch_rates())
+
+
+def test_retry_and_error(tmp_path, no_threads):
+    server = ProviderStubServer(StubSettings(error_rate=1))
+    server.start()
+    try:
+        config = make_config(tmp_path, server, retry_total=2)
+        client = ExchangeRateApiClient(config)
+        with pytest.raises(ApiHTTPError):
+            asyncio.run(client.fetch_rates_async())
+        counts = exchangerate_requests(server)
+    finally:
+        server.stop()
+    assert counts == [config.retry_total + 1] * len(counts)
+
+
+@pytest.mark.parametrize("status", [HTTPStatus.TOO_MANY_REQUESTS,
+                                    HTTPStatus.SERVICE_UNAVAILABLE])
+def test_rate_limited_client_does_not_retry(tmp_path, status):
+    server = ProviderStubServer(
+        StubSettings(error_rate=1, error_status=status)
+    )
+    server.start()
+    try:
+        config = make_config(
+            tmp_path, server,
+            rate_limits={"ExchangeRateApi": {"requests": 100, "period": 60}}
+        )
+        client = ExchangeRateApiClient(config)
+        with pytest.raises(ApiHTTPError):
+            client.fetch_rates()
+        # синхронный клиент останавливается на первой ошибке
+        assert exchangerate_requests(server) == [1]
+        with pytest.raises(ApiHTTPError):
+            asyncio.run(client.fetch_rates_async())
+        assert max(exchangerate_requests(server)) == 2
+    finally:
+        server.stop()
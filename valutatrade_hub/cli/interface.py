@@ -8,7 +8,6 @@ from valutatrade_hub.core import models, usercases
 from valutatrade_hub.core.exceptions import CoreError
 from valutatrade_hub.core.models.operation_info import BalanceOperationType
 from valutatrade_hub.parser_service.exception import ApiRequestError
-from valutatrade_hub.parser_service.updater import RatesUpdater
 
 from .commands import (
     CommandArgsType,
@@ -46,14 +45,20 @@ class Engine:
     :param config: конфигурация приложения.
     :param parser_service: сервис парсинга курсов валют.
     """
-    def __init__(self, config: Config, parser_service: RatesUpdater):
+    def __init__(
+            self,
+            config: Config,
+            parser_service: usercases.RatesServiceType
+    ):
         self._core = usercases.Core(
             config.data_path,
             config.rates_file_path,
             config.user_passwd_min_length,
             parser_service,
             config.rates_update_interval,
-            config.base_currency
+            config.base_currency,
+            config.rates_stale_while_revalidate,
+            config.rates_max_staleness
         )
         self._base_currency = config.base_currency
         self._current_user: Optional[models.User] = None
@@ -147,8 +152,13 @@ class Engine:
             else self._base_currency
         data = []
         try:
-            wallets: dict[models.Wallet, float] = \
-                self._core.get_wallets_balances(
+            with self._core.pin_rates():
+                wallets: dict[models.Wallet, float] = \
+                    self._core.get_wallets_balances(
+                        self._current_user.user_id,
+                        base
+                    )
+                total_balance: float = self._core.get_total_balance(
                     self._current_user.user_id,
                     base
                 )
@@ -157,10 +167,6 @@ class Engine:
                     f"- {wallet.currency_code}: {wallet.balance:,.2f} "
                     f"-> {balance:,.2f} {base}"
                 )
-            total_balance: float = self._core.get_total_balance(
-                self._current_user.user_id,
-                base
-            )
         except usercases.UnknownUserError:
             print(
                 f"Не найден портфель для пользователя "
@@ -274,10 +280,14 @@ class Engine:
         except KeyError as e:
             print(f"Не передан обязательный параметр: {e}")
         else:
-            rate, last_update = self._core.get_rate(from_currency, to_currency)
+            rate_info = self._core.get_rate(from_currency, to_currency)
+            rate = rate_info.rate
+            last_update = rate_info.updated_at
+            stale = ", устарел" if rate_info.stale else ""
             print(
                 f"Курс {from_currency} -> {to_currency}: {rate} "
-                f"(обновлено: {last_update.strftime('%Y-%m-%d %H:%M:%S')})\n"
+                f"(обновлено: {last_update.strftime('%Y-%m-%d %H:%M:%S')}"
+                f"{stale})\n"
                 f"Обратный курс: {1 / rate}"
             )
 
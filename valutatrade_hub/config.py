@@ -14,3 +14,11 @@ class Config(JsonSettingsLoader, metaclass=SingletonMeta):
     rates_file_path = Parameter(Path)
     #: интервал обновления курсов валют (в минутах)
     rates_update_interval: int = Parameter(ptype=int, default=5)
+    #: возвращать устаревший курс сразу, обновляя курсы в фоне
+    rates_stale_while_revalidate: bool = Parameter(ptype=bool, default=False)
+    #: максимальный возраст курса (в минутах), после которого курсы
+    #: обновляются синхронно
+    rates_max_staleness: int = Parameter(ptype=int, default=60)
+    #: путь до Unix-сокета демона курсов (project-rates); если не задан, то
+    #: курсы обновляет само приложение
+    rates_socket_path: str = Parameter(default="")
@@ -1,6 +1,7 @@
 from enum import Enum
 from typing import Optional
 
+from valutatrade_hub.parser_service.models import RateVector
 from valutatrade_hub.parser_service.models.storage import RateDictType
 
 from .wallet import Wallet
@@ -32,6 +33,15 @@ class Portfolio:
     def wallets(self) -> dict[str, Wallet]:
         return self._wallets.copy()
 
+    @property
+    def balances(self) -> dict[str, float]:
+        """
+        :return: балансы кошельков вида {код валюты: баланс}.
+        """
+        return {
+            code: wallet.balance for code, wallet in self._wallets.items()
+        }
+
     def add_currency(self, currency_code: str) -> Wallet:
         """
         Добавляет кошелек для указанной валюты.
@@ -50,13 +60,17 @@ class Portfolio:
 
     def get_total_value(
             self,
-            rates: RateDictType,
+            rates: RateDictType | RateVector,
             base_currency="USD"
     ) -> float:
         """
         Получить общую стоимость портфеля в указанной валюте.
 
-        :param rates: словарь с курсами валют вида {код валюты: курс}
+        Если передан вектор курсов, то стоимость вычисляется одним скалярным
+        произведением, иначе - суммированием по кошелькам.
+
+        :param rates: словарь с курсами валют вида {код валюты: курс} или
+            вектор курсов относительно base_currency.
 
         :param base_currency: код валюты, относительно которой будет посчитана
             стоимость портфеля.
@@ -68,6 +82,8 @@ class Portfolio:
 
         :raises ValueError: если не удалось получить курс для валюты.
         """
+        if isinstance(rates, RateVector):
+            return rates.value(self.balances)
         total_value = 0
         for wallet in self._wallets.values():
             total_value += wallet.convert(base_currency, rates)
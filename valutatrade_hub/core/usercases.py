@@ -1,18 +1,26 @@
 import secrets
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import NamedTuple
 
 from valutatrade_hub.core.exceptions import InsufficientFundsError
 from valutatrade_hub.infra.database import DatabaseManager, DataError
+from valutatrade_hub.parser_service.daemon import RatesSubscriber
 from valutatrade_hub.parser_service.exception import ApiRequestError
-from valutatrade_hub.parser_service.models.storage import RateDictType, Storage
-from valutatrade_hub.parser_service.updater import RatesUpdater
+from valutatrade_hub.parser_service.models.storage import RateDictType
+from valutatrade_hub.parser_service.updater import (
+    RatesStorageType,
+    RatesUpdater,
+)
 
 from .decorators import log_action
 from .exceptions import CoreError
 from .models import OperationInfo, Portfolio, User, Wallet
 from .models.wallet import NegativeBalanceError
-from .utils.rates import load_rates
+from .utils.rates import load_rates, rates_mtime
 
 
 class UserError(CoreError):
@@ -61,6 +69,37 @@ class SaveDataError(CoreError):
     pass
 
 
+#: сервис обновления курсов валют: локальный или демон (см. RatesSubscriber)
+RatesServiceType = RatesUpdater | RatesSubscriber
+
+
+class RateInfo(NamedTuple):
+    """
+    Информация о курсе валюты.
+    """
+    rate: float
+    #: время обновления курса
+    updated_at: datetime
+    #: возраст курса
+    age: timedelta
+    #: True, если курсы источника устарели (см. RatesUpdater.stale_sources)
+    stale: bool
+
+
+class _RatesState(NamedTuple):
+    """
+    Состояние курсов валют в ядре.
+
+    Заменяется целиком одним присваиванием, поэтому параллельные читатели
+    видят согласованные значения без блокировок.
+    """
+    #: версия снимка курсов, полученного от сервиса обновления курсов
+    version: int | None
+    #: время изменения файла с курсами на момент последней синхронизации
+    mtime: int | None
+    storage: RatesStorageType
+
+
 class Core:
     """
     Ядро приложения.
@@ -69,16 +108,25 @@ class Core:
     :param rates_path: путь к файлу с курсами валют.
     :param user_passwd_min_length: минимальная длина пароля пользователя.
     :param rates_updater: сервис обновления курсов валют.
-    :param rates_update_interval: интервал обновления курсов валют (в минутах).
+    :param rates_update_interval: интервал обновления курсов валют (в минутах)
+        для источников, время жизни курсов которых не задано в конфигурации
+        парсера.
+    :param base_currency: базовая валюта.
+    :param stale_while_revalidate: возвращать устаревший курс сразу,
+        обновляя курсы в фоне (см. get_rate).
+    :param rates_max_staleness: максимальный возраст курса (в минутах),
+        после которого курсы обновляются синхронно.
     """
     def __init__(
             self,
             data_path: Path,
             rates_path: Path,
             user_passwd_min_length: int,
-            rates_updater: RatesUpdater,
+            rates_updater: RatesServiceType,
             rates_update_interval: int,
-            base_currency: str
+            base_currency: str,
+            stale_while_revalidate: bool = False,
+            rates_max_staleness: int = 60
     ):
         User.set_min_password_length(user_passwd_min_length)
         self._base_currency = base_currency
@@ -86,8 +134,13 @@ class Core:
         self._db_manager = DatabaseManager(data_path)
         self._parser_service = rates_updater
         self._rates_path = rates_path
-        self._rates: Storage = load_rates(rates_path)
+        self._rates: _RatesState | None = None
+        #: курсы, закрепленные за потоком (см. pin_rates)
+        self._pinned = threading.local()
+        self._sync_rates()
         self._rates_update_interval = timedelta(minutes=rates_update_interval)
+        self._stale_while_revalidate = stale_while_revalidate
+        self._rates_max_staleness = timedelta(minutes=rates_max_staleness)
         try:
             self._users: list[User] = self._db_manager.load_data(User)
             self._portfolios: list[Portfolio] = self._db_manager.load_data(
@@ -96,6 +149,78 @@ class Core:
         except DataError as e:
             raise CoreError(str(e))
 
+    def _sync_rates(self) -> RatesStorageType:
+        """
+        Синхронизация курсов валют.
+
+        Если сервис обновления курсов опубликовал новую версию хранилища, то
+        используется она, без повторного чтения файла. Файл с курсами
+        читается только при первом запуске или если он был изменен другим
+        процессом (запись используемой версии сервисом обновления курсов
+        определяется по RatesUpdater.written); из двух источников
+        выбирается более свежий.
+
+        Если текущий поток закрепил курсы (см. pin_rates), то возвращаются
+        закрепленные курсы.
+
+        :return: актуальное хранилище курсов валют.
+
+        :raises CoreError: если не удалось загрузить курсы из файла.
+        """
+        pinned: RatesStorageType | None = getattr(
+            self._pinned, "storage", None
+        )
+        if pinned is not None:
+            return pinned
+        state = self._rates
+        snapshot = self._parser_service.snapshot
+        if snapshot and (state is None or snapshot.version != state.version):
+            storage = snapshot.storage
+            if (state is not None and
+                    state.storage.last_refresh > storage.last_refresh):
+                storage = state.storage
+            state = _RatesState(
+                snapshot.version, rates_mtime(self._rates_path), storage
+            )
+        mtime = rates_mtime(self._rates_path)
+        if state is not None and mtime != state.mtime and \
+                self._parser_service.written == (state.version, mtime):
+            # файл изменен записью уже используемой версии
+            state = state._replace(mtime=mtime)
+        if state is None or mtime != state.mtime:
+            storage = load_rates(self._rates_path)
+            if (state is not None and
+                    state.storage.last_refresh >= storage.last_refresh):
+                storage = state.storage
+            state = _RatesState(
+                state.version if state else None, mtime, storage
+            )
+        # замененное хранилище не закрывается явно: его еще могут читать
+        # другие потоки, а отображенный в память файл (см. MappedStorage)
+        # освобождается вместе с последней ссылкой на хранилище
+        self._rates = state
+        return state.storage
+
+    @contextmanager
+    def pin_rates(self) -> Iterator[RatesStorageType]:
+        """
+        Закрепление курсов валют за текущим потоком.
+
+        Все вызовы ядра из текущего потока внутри блока with используют одну
+        и ту же версию курсов, даже если параллельно публикуется новая.
+
+        :return: закрепленное хранилище курсов валют.
+
+        :raises CoreError: если не удалось загрузить курсы из файла.
+        """
+        storage = self._sync_rates()
+        previous = getattr(self._pinned, "storage", None)
+        self._pinned.storage = storage
+        try:
+            yield storage
+        finally:
+            self._pinned.storage = previous
+
     @property
     def user_names(self) -> list[str]:
         """
@@ -219,10 +344,11 @@ class Core:
         :return: баланс портфеля в указанной валюте.
         """
         portfolio: Portfolio = self.get_portfolio(user_id)
-        return portfolio.get_total_value(
-            self._rates.get_exchange_rate(base_currency),
-            base_currency
-        )
+        storage = self._sync_rates()
+        rates = storage.rate_vector(base_currency)
+        if rates is None:
+            rates = storage.get_exchange_rate(base_currency)
+        return portfolio.get_total_value(rates, base_currency)
 
     def get_wallets_balances(
             self,
@@ -247,7 +373,9 @@ class Core:
             если не удалось получить курс валюты.
         """
         portfolio = self.get_portfolio(user_id)
-        rates: RateDictType = self._rates.get_exchange_rate(base_currency)
+        rates: RateDictType = self._sync_rates().get_exchange_rate(
+            base_currency
+        )
         data = {}
         for wallet in portfolio.wallets.values():
             data[wallet] = wallet.convert(base_currency, rates)
@@ -332,7 +460,7 @@ class Core:
             wallet.balance += operation_info.amount
             self._db_manager.save_data(Portfolio, self._portfolios)
             operation_info.after_balance = wallet.balance
-            operation_info.rate = self._rates.get_rate(
+            operation_info.rate = self._sync_rates().get_rate(
                 operation_info.base_currency, operation_info.currency_code
             )
         except SaveDataError as e:
@@ -348,24 +476,83 @@ class Core:
     def get_rate(
             self,
             from_currency: str,
-            to_currency: str
-    ) -> tuple[float, datetime]:
+            to_currency: str,
+            timestamp: datetime | None = None
+    ) -> RateInfo:
         """
         Получение курса валюты.
 
+        Если курсы источника устарели, то в режиме stale-while-revalidate
+        курс возвращается сразу с отметкой stale, а курсы устаревших
+        источников обновляются в фоне (см. RatesUpdater.revalidate). Вне
+        этого режима курсы обновляются синхронно, если не запущено фоновое
+        обновление (см. RatesUpdater.start). Курс старше максимального
+        возраста всегда обновляется синхронно.
+
         :param from_currency: код конвертируемой валюты.
         :param to_currency: код валюты, в которую будет конвертироваться.
-        :return: курс валюты, дата и время обновления курса.
+        :param timestamp: момент времени. Если указан, то возвращается курс,
+            действовавший в этот момент (см. Storage.get_rate), без
+            обновления курсов.
+
+        :return: информация о курсе (для курса на момент времени время
+            обновления - timestamp).
 
         :raises valutatrade_hub.parser_service.exception.ApiRequestError:
             если не удалось получить курс валюты.
         """
-        last_refresh = datetime.now() - self._rates.last_refresh
-        if last_refresh >= self._rates_update_interval:
-            self._parser_service.run_update()
-            self._rates = load_rates(self._rates_path)
-        rate = self._rates.get_rate(from_currency, to_currency)
-        return rate, self._rates.last_refresh
+        storage = self._sync_rates()
+        if timestamp is not None:
+            rate = storage.get_rate(from_currency, to_currency, timestamp)
+            return RateInfo(rate, timestamp, datetime.now() - timestamp, False)
+        updated_at, age, is_stale = self._rate_freshness(
+            storage, from_currency, to_currency
+        )
+        if age >= self._rates_max_staleness or (
+                is_stale
+                and not self._stale_while_revalidate
+                and not self._parser_service.running
+        ):
+            if self._parser_service.refresh_stale(
+                    storage, self._rates_update_interval
+            ):
+                storage = self._sync_rates()
+                updated_at, age, is_stale = self._rate_freshness(
+                    storage, from_currency, to_currency
+                )
+        elif is_stale and self._stale_while_revalidate:
+            self._parser_service.revalidate(
+                storage, self._rates_update_interval
+            )
+        rate = storage.get_rate(from_currency, to_currency)
+        return RateInfo(rate, updated_at, age, is_stale)
+
+    def _rate_freshness(
+            self,
+            storage: RatesStorageType,
+            from_currency: str,
+            to_currency: str
+    ) -> tuple[datetime, timedelta, bool]:
+        """
+        Определение свежести курса валюты.
+
+        Курс устарел, если устарели курсы его источника (см.
+        RatesUpdater.stale_sources). Для кросс-курсов учитываются все
+        источники.
+
+        :param storage: хранилище курсов валют.
+        :param from_currency: код конвертируемой валюты.
+        :param to_currency: код валюты, в которую будет конвертироваться.
+        :return: время обновления курса, возраст курса, признак устаревания.
+        """
+        record = storage.find_rate(from_currency, to_currency)
+        updated_at = record.updated_at if record else storage.last_refresh
+        stale_sources = self._parser_service.stale_sources(
+            storage, self._rates_update_interval
+        )
+        is_stale = record.source in stale_sources if record \
+            else bool(stale_sources)
+        return updated_at, datetime.now() - updated_at, is_stale
 
     def update_rates(self, source: str | None) -> None:
         """
@@ -378,6 +565,7 @@ class Core:
             self._parser_service.run_update(source)
         except ApiRequestError as e:
             raise CoreError(f"Ошибка обновления курсов: {e}")
+        self._sync_rates()
 
     def show_rates(
             self,
@@ -398,15 +586,16 @@ class Core:
 
         :return: курсы валют, дата и время обновления курса.
         """
+        storage = self._sync_rates()
         if currency:
             rates ={
                 f"{currency}_{self._base_currency}":
-                    self._rates.get_rate(currency, self._base_currency)
+                    storage.get_rate(currency, self._base_currency)
             }
         elif top:
-            rates = self._rates.top(top)
+            rates = storage.top(top)
         elif base:
-            rates = self._rates.get_exchange_rate(base)
+            rates = storage.get_exchange_rate(base)
         else:
             raise ValueError("Не указаны параметры для вывода курсов валют")
-        return rates, self._rates.last_refresh
+        return rates, storage.last_refresh
@@ -2,19 +2,35 @@ from json import JSONDecodeError, load
 from pathlib import Path
 
 from valutatrade_hub.parser_service.models import Storage
+from valutatrade_hub.parser_service.models.binary_storage import (
+    BinaryStorageError,
+    MappedStorage,
+)
 
 from ..exceptions import CoreError
 
 
-def load_rates(file_path: Path) -> Storage:
+def load_rates(file_path: Path) -> Storage | MappedStorage:
     """
     Загрузка данных о курсах валют из файла
+
+    Если рядом с JSON-файлом есть двоичный снимок (*.bin) не старше его, то
+    снимок отображается в память (см. MappedStorage) вместо разбора JSON.
+
     :param file_path: Путь к файлу.
-    :return: Объект Storage.
+    :return: Объект Storage или MappedStorage.
 
     :raises JSONDecodeError: Если файл содержит невалидный JSON.
     :raises OSError: если не удалось прочитать файл.
     """
+    binary_path = file_path.with_suffix(".bin")
+    binary_mtime = rates_mtime(binary_path)
+    if binary_mtime is not None and \
+            binary_mtime >= (rates_mtime(file_path) or 0):
+        try:
+            return MappedStorage(binary_path)
+        except (OSError, BinaryStorageError):
+            pass
     try:
         with open(file_path) as file:
             data = load(file)
@@ -23,3 +39,17 @@ def load_rates(file_path: Path) -> Storage:
         raise CoreError(f"Ошибка при загрузке данных о курсах валют: "
                         f"{e} ({e.__class__.__name__})")
 
+
+
+def rates_mtime(file_path: Path) -> int | None:
+    """
+    Получение времени изменения файла с курсами валют.
+
+    :param file_path: Путь к файлу.
+    :return: время изменения файла в наносекундах, если файл существует,
+        иначе None.
+    """
+    try:
+        return file_path.stat().st_mtime_ns
+    except OSError:
+        return None
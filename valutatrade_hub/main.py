@@ -1,15 +1,37 @@
+import signal
 from argparse import ArgumentParser
+from datetime import timedelta
+from pathlib import Path
 
 from valutatrade_hub.cli.interface import Engine
 from valutatrade_hub.config import Config
 from valutatrade_hub.logger import Logger
 from valutatrade_hub.parser_service.api_clients import init_clients
 from valutatrade_hub.parser_service.config import ParserConfig
+from valutatrade_hub.parser_service.daemon import RatesServer, RatesSubscriber
 from valutatrade_hub.parser_service.updater import RatesUpdater
 
 
 def main():
-    parser = ArgumentParser(description="ValutaTrade Hub")
+    args = _argument_parser("ValutaTrade Hub").parse_args()
+    run(args.config, args.ps_config, args.logger_config)
+
+
+def rates_main():
+    args = _argument_parser(
+        "ValutaTrade Hub: демон обновления курсов валют"
+    ).parse_args()
+    run_rates_daemon(args.config, args.ps_config, args.logger_config)
+
+
+def _argument_parser(description: str) -> ArgumentParser:
+    """
+    Создание парсера аргументов командной строки.
+
+    :param description: описание программы.
+    :return: парсер аргументов.
+    """
+    parser = ArgumentParser(description=description)
     parser.add_argument(
         "--config",
         type=str,
@@ -31,8 +53,7 @@ def main():
         required=True,
         help="Путь к файлу конфигурации логгера"
     )
-    args = parser.parse_args()
-    run(args.config, args.ps_config, args.logger_config)
+    return parser
 
 
 def run(
@@ -46,20 +67,102 @@ def run(
     parser_config.load()
     logger = Logger(logger_config_path)
     logger.load()
-    updater = _init_parser_service(parser_config, logger)
+    updater = _init_parser_service(parser_config, logger, config)
     try:
         Engine(config, updater).run()
     except KeyboardInterrupt:
         print("Завершение работы...")
+    finally:
+        updater.stop()
+
+
+def run_rates_daemon(
+        config_path: str,
+        ps_config_path: str,
+        logger_config_path: str
+):
+    """
+    Запуск демона обновления курсов валют.
+
+    Демон обновляет курсы в фоне и раздает их по Unix-сокету
+    rates_socket_path, пока не получит SIGINT или SIGTERM.
+
+    :param config_path: путь к файлу конфигурации.
+    :param ps_config_path: путь к файлу конфигурации парсера.
+    :param logger_config_path: путь к файлу конфигурации логгера.
+    :return: None.
+    """
+    config = Config(config_path)
+    config.load()
+    if not config.rates_socket_path:
+        raise SystemExit("Не задан параметр rates_socket_path")
+    parser_config = ParserConfig(ps_config_path)
+    parser_config.load()
+    logger = Logger(logger_config_path)
+    logger.load()
+    updater = _init_updater(parser_config, logger, config)
+    server = RatesServer(
+        updater,
+        Path(config.rates_socket_path),
+        timedelta(minutes=config.rates_update_interval)
+    )
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Завершение работы...")
+    finally:
+        server.close()
+        updater.stop()
 
 
 def _init_parser_service(
         parser_config: ParserConfig,
-        logger: Logger
+        logger: Logger,
+        config: Config
+) -> RatesUpdater | RatesSubscriber:
+    """
+    Инициализация сервиса обновления курсов.
+
+    Если задан сокет демона курсов (rates_socket_path), то курсы получаются
+    от демона. Иначе курсы обновляются в фоне самим приложением (см.
+    _init_updater).
+
+    :param parser_config: конфигурация парсера.
+    :param logger: логгер.
+    :param config: конфигурация приложения.
+    :return: сервис обновления курсов.
+    """
+    if config.rates_socket_path:
+        subscriber = RatesSubscriber(
+            parser_config, Path(config.rates_socket_path)
+        )
+        subscriber.start()
+        return subscriber
+    return _init_updater(parser_config, logger, config)
+
+
+def _init_updater(
+        parser_config: ParserConfig,
+        logger: Logger,
+        config: Config
 ) -> RatesUpdater:
+    """
+    Инициализация и запуск фонового обновления курсов.
+
+    Синхронное обновление выполняется только при первом запуске, когда
+    файла с курсами еще нет.
+
+    :param parser_config: конфигурация парсера.
+    :param logger: логгер.
+    :param config: конфигурация приложения.
+    :return: сервис обновления курсов.
+    """
     clients = init_clients(parser_config)
     updater = RatesUpdater(parser_config, logger, *clients)
-    updater.run_update()
+    if not updater.rates_file_path.exists():
+        updater.run_update()
+    updater.start(timedelta(minutes=config.rates_update_interval))
     return updater
 
 
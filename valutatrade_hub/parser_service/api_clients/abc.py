@@ -1,16 +1,46 @@
+import asyncio
+import random
 from abc import ABCMeta, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import replace
+from datetime import datetime
+from http import HTTPStatus
 from logging import getLogger
-from typing import Optional
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
 
 from valutatrade_hub.parser_service import models
 from valutatrade_hub.parser_service.config import ParserConfig
 from valutatrade_hub.parser_service.exception import ApiRequestError
 from valutatrade_hub.parser_service.models import ApiClientInfo
+from valutatrade_hub.parser_service.models.exchange_rate_buffer import (
+    ExchangeRateBuffer,
+)
 from valutatrade_hub.parser_service.models.rate import RatesType, rate_key
 from valutatrade_hub.parser_service.utils.lead_time import LeadTime
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+#: максимальная задержка перед повторной попыткой (как в urllib3 Retry)
+_RETRY_BACKOFF_MAX = 120
+
+
+def aiohttp_available() -> bool:
+    """
+    :return: True, если установлен aiohttp.
+    """
+    return aiohttp is not None
+
 
 class ApiHTTPError(ApiRequestError):
     def __init__(self, response: requests.Response):
@@ -48,15 +78,120 @@ class ClientApiRequestError(ApiRequestError):
                 f"{self._error} ({self._error_type})")
 
 
+#: функция разбора ответа: (ответ, время выполнения запроса) -> записи
+ParseResponseType = Callable[
+    [requests.Response, int], list[models.ExchangeRate]
+]
+
+
+class _CachedResponse(NamedTuple):
+    """
+    Валидаторы и разобранный результат последнего ответа на запрос.
+    """
+    etag: str | None
+    last_modified: str | None
+    records: list[models.ExchangeRate]
+
+
 class BaseApiClient(metaclass=ABCMeta):
     def __init__(self, config: ParserConfig):
-        self._history: list[models.ExchangeRate] = []
+        self._history = ExchangeRateBuffer(config.max_history_len)
+        self._last_fetch: list[models.ExchangeRate] = []
+        #: максимальное время ответа на запрос текущего вызова fetch_rates
+        self._request_latency = 0.0
+        self._latency_lock = Lock()
+        #: последние ответы вида {url запроса: _CachedResponse}
+        self._cached_responses: dict[str, _CachedResponse] = {}
         self._config = config
         self._logger = getLogger()
+        #: запросы к API ограничены (см. ParserConfig.rate_limits)
+        self._rate_limited = self.info.name in config.rate_limits
+        self._session = self._create_session(config, self._rate_limited)
+        #: сессия aiohttp текущего вызова fetch_rates_async
+        self._async_session: Optional["aiohttp.ClientSession"] = None
+
+    @staticmethod
+    def _create_session(
+            config: ParserConfig,
+            rate_limited: bool = False
+    ) -> requests.Session:
+        """
+        Создание сессии с пулом keep-alive соединений.
+
+        Запросы повторяются при ошибках соединения и при кодах ответа из
+        retry_status_codes с экспоненциальной задержкой
+        retry_backoff_factor * 2 ** (номер попытки - 1) плюс случайная
+        добавка до retry_backoff_jitter секунд. Если попытки закончились, то
+        возвращается последний ответ (см. _request).
+
+        Ограничитель запросов (см. RatesUpdater) резервирует один запрос на
+        каждый запрос клиента, поэтому при ограничении запросов повторяются
+        только запросы, которые не дошли до API (ошибки подключения); ответы
+        с ошибкой, в том числе 429 с заголовком Retry-After, и ошибки
+        чтения не повторяются.
+
+        :param config: конфигурация.
+        :param rate_limited: запросы к API ограничены.
+        :return: сессия.
+        """
+        retry = Retry(
+            total=config.retry_total,
+            read=0 if rate_limited else None,
+            status_forcelist=() if rate_limited
+            else config.retry_status_codes,
+            respect_retry_after_header=not rate_limited,
+            backoff_factor=config.retry_backoff_factor,
+            backoff_jitter=config.retry_backoff_jitter,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config.http_pool_size,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        """
+        Закрытие соединений сессии.
+
+        :return: None.
+        """
+        self._session.close()
 
     @property
-    def history(self) -> list[models.ExchangeRate]:
-        return self._history
+    def history(self) -> Sequence[models.ExchangeRate]:
+        """
+        :return: последние max_history_len журнальных записей (без
+            копирования, см. ExchangeRateBuffer.view).
+        """
+        return self._history.view()
+
+    @property
+    def last_fetch(self) -> list[models.ExchangeRate]:
+        """
+        :return: журнальные записи, полученные последним вызовом fetch_rates.
+        """
+        return self._last_fetch
+
+    @property
+    def request_latency(self) -> float:
+        """
+        :return: максимальное время ответа API на один запрос последнего
+            вызова fetch_rates (в секундах, см. _record_latency).
+        """
+        return self._request_latency
+
+    @property
+    def requests_per_fetch(self) -> int:
+        """
+        :return: количество запросов к API при одном вызове fetch_rates
+            (учитывается ограничением запросов, см. RatesUpdater).
+        """
+        return 1
 
     @property
     @abstractmethod
@@ -88,12 +223,13 @@ class BaseApiClient(metaclass=ABCMeta):
         :param headers: список заголовков.
         :param params: параметры запроса.
         :param json: json тела запроса.
-        :return: ответ от API, время выполнения запроса.
+        :return: ответ от API, время выполнения запроса (включая повторные
+            попытки).
 
         :raises requests.RequestException: ошибка при обращении к API.
         """
         with LeadTime() as lead_time:
-            response: requests.Response = requests.request(
+            response: requests.Response = self._session.request(
                 method,
                 url,
                 params=params,
@@ -101,16 +237,155 @@ class BaseApiClient(metaclass=ABCMeta):
                 headers=headers,
                 timeout=self._config.request_timeout
             )
+        self._record_latency(response.elapsed.total_seconds())
         response.raise_for_status()
         return response, lead_time.duration
 
+    def _record_latency(self, duration: float) -> None:
+        """
+        Регистрация времени ответа на запрос к API.
+
+        Учитывается только время запроса (без разбора ответа и других
+        запросов того же вызова fetch_rates), поэтому оно сравнимо с
+        request_timeout.
+
+        :param duration: время ответа (в секундах).
+        :return: None.
+        """
+        with self._latency_lock:
+            self._request_latency = max(self._request_latency, duration)
+
+    def _conditional_request(
+            self,
+            url: str,
+            parse: ParseResponseType,
+            params: Optional[dict] = None
+    ) -> list[models.ExchangeRate]:
+        """
+        Условный GET-запрос к API.
+
+        Вместе с запросом отправляются валидаторы (ETag, Last-Modified)
+        предыдущего ответа на тот же url. Если API ответил 304 Not Modified,
+        то тело не загружается и не разбирается: возвращаются записи
+        предыдущего ответа с новым временем (см. _not_modified_records).
+
+        :param url: url запроса.
+        :param parse: функция разбора ответа.
+        :param params: параметры запроса.
+        :return: список журнальных записей.
+
+        :raises requests.RequestException: ошибка при обращении к API.
+        """
+        key = self._cache_key(url, params)
+        response, lead_time = self._request(
+            url, headers=self._conditional_headers(key), params=params
+        )
+        return self._conditional_records(key, response, lead_time, parse)
+
+    async def _conditional_request_async(
+            self,
+            url: str,
+            parse: ParseResponseType,
+            params: Optional[dict] = None
+    ) -> list[models.ExchangeRate]:
+        """
+        Асинхронный условный GET-запрос к API (см. _conditional_request).
+        """
+        key = self._cache_key(url, params)
+        response, lead_time = await self._request_async(
+            url, headers=self._conditional_headers(key), params=params
+        )
+        return self._conditional_records(key, response, lead_time, parse)
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[dict]) -> str:
+        """
+        :return: url запроса с параметрами.
+        """
+        request = requests.PreparedRequest()
+        request.prepare_url(url, params)
+        return request.url
+
+    def _conditional_headers(self, key: str) -> dict[str, str]:
+        """
+        :param key: url запроса с параметрами.
+        :return: заголовки условного запроса.
+        """
+        cached = self._cached_responses.get(key)
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def _conditional_records(
+            self,
+            key: str,
+            response: requests.Response,
+            request_ms: int,
+            parse: ParseResponseType
+    ) -> list[models.ExchangeRate]:
+        """
+        Получение записей по ответу на условный запрос.
+
+        :param key: url запроса с параметрами.
+        :param response: ответ от API.
+        :param request_ms: время выполнения запроса.
+        :param parse: функция разбора ответа.
+        :return: список журнальных записей.
+        """
+        cached = self._cached_responses.get(key)
+        if response.status_code == HTTPStatus.NOT_MODIFIED and cached:
+            return self._not_modified_records(cached.records, request_ms)
+        records = parse(response, request_ms)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._cached_responses[key] = _CachedResponse(
+                etag, last_modified, records
+            )
+        else:
+            self._cached_responses.pop(key, None)
+        return records
+
+    @staticmethod
+    def _not_modified_records(
+            records: list[models.ExchangeRate],
+            request_ms: int
+    ) -> list[models.ExchangeRate]:
+        """
+        Копирование записей предыдущего ответа для ответа 304.
+
+        Курсы не изменились, но подтверждены API сейчас, поэтому записи
+        получают текущее время и метаданные нового запроса.
+
+        :param records: записи предыдущего ответа.
+        :param request_ms: время выполнения запроса.
+        :return: список журнальных записей.
+        """
+        now = datetime.now()
+        return [
+            replace(
+                record,
+                timestamp=now,
+                meta=replace(
+                    record.meta,
+                    request_ms=request_ms,
+                    status_code=HTTPStatus.NOT_MODIFIED
+                )
+            )
+            for record in records
+        ]
+
     @staticmethod
     def _form_rages(exchange_rates: list[models.ExchangeRate]) -> RatesType:
         """
         Формирование словаря курсов валют.
 
         :param exchange_rates: список журнальных записей.
-        :return: словарь курсов валют виз {from_currency_to_currency: Rate}.
+        :return: словарь курсов валют вида
+            {(from_currency_id, to_currency_id): Rate}.
         """
         rates = {}
         for item in exchange_rates:
@@ -126,16 +401,219 @@ class BaseApiClient(metaclass=ABCMeta):
         """
         Получение данных от API.
 
-        :return: словарь курсов валют виз {from_currency_to_currency: Rate}.
+        :return: словарь курсов валют вида
+            {(from_currency_id, to_currency_id): Rate}.
 
         :raises BACRequestError: ошибка при обращении к API.
         """
-        try:
+        self._request_latency = 0.0
+        with self._request_errors():
             data = self._call_api()
-            self._history.extend(data)
-            if len(self._history) > self._config.max_history_len:
-                self._history = self._history[-self._config.max_history_len:]
-            return self._form_rages(data)
+        return self._store_fetch(data)
+
+    async def fetch_rates_async(self) -> RatesType:
+        """
+        Асинхронное получение данных от API.
+
+        Запросы выполняются в текущем событийном цикле через aiohttp, без
+        блокировки потоков. Требует aiohttp.
+
+        :return: словарь курсов валют вида
+            {(from_currency_id, to_currency_id): Rate}.
+
+        :raises BACRequestError: ошибка при обращении к API.
+        :raises RuntimeError: если не установлен aiohttp.
+        """
+        if aiohttp is None:
+            raise RuntimeError(
+                "Для асинхронного получения курсов требуется aiohttp"
+            )
+        self._request_latency = 0.0
+        async with self._open_async_session():
+            with self._request_errors():
+                data = await self._call_api_async()
+        return self._store_fetch(data)
+
+    @abstractmethod
+    async def _call_api_async(self) -> list[models.ExchangeRate]:
+        """
+        Асинхронный запрос к API (см. _request_async).
+
+        :return: список журнальных записей.
+        """
+        pass
+
+    @asynccontextmanager
+    async def _open_async_session(self) -> AsyncIterator[None]:
+        """
+        Открытие сессии aiohttp на время вызова fetch_rates_async.
+
+        Сессия привязана к событийному циклу, в котором создана, поэтому
+        она не переиспользуется между вызовами. Запросы одного вызова
+        разделяют пул из http_pool_size соединений.
+        """
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self._config.http_pool_size),
+            timeout=aiohttp.ClientTimeout(total=self._config.request_timeout)
+        )
+        self._async_session = session
+        try:
+            yield
+        finally:
+            self._async_session = None
+            await session.close()
+
+    async def _request_async(
+            self,
+            url: str,
+            method: str = "GET",
+            headers: Optional[dict] = None,
+            params: Optional[dict] = None,
+            json: Optional[dict] = None
+    ) -> tuple[requests.Response, int]:
+        """
+        Асинхронный запрос к API (см. _request).
+
+        Запрос повторяется по тем же правилам, что и в сессии requests (см.
+        _create_session), в том числе при ограничении запросов. Ответ
+        преобразуется в requests.Response, поэтому разбор ответов общий для
+        синхронных и асинхронных запросов.
+
+        :param url: url запроса.
+        :param method: метод запроса (GET, POST, ...).
+        :param headers: список заголовков.
+        :param params: параметры запроса.
+        :param json: json тела запроса.
+        :return: ответ от API, время выполнения запроса (включая повторные
+            попытки).
+
+        :raises requests.RequestException: ошибка при обращении к API.
+        """
+        retries = self._config.retry_total
+        status_codes = () if self._rate_limited \
+            else self._config.retry_status_codes
+        with LeadTime() as lead_time:
+            for retry in range(retries + 1):
+                if retry:
+                    await asyncio.sleep(self._retry_delay(retry))
+                try:
+                    start = monotonic()
+                    response = await self._send_async(
+                        url, method, headers, params, json
+                    )
+                except requests.RequestException as e:
+                    if retry == retries or not self._retry_error(e):
+                        raise
+                    continue
+                self._record_latency(monotonic() - start)
+                if retry == retries or \
+                        response.status_code not in status_codes:
+                    break
+        response.raise_for_status()
+        return response, lead_time.duration
+
+    async def _send_async(
+            self,
+            url: str,
+            method: str,
+            headers: Optional[dict],
+            params: Optional[dict],
+            json: Optional[dict]
+    ) -> requests.Response:
+        """
+        Одна попытка асинхронного запроса.
+
+        :return: ответ от API.
+
+        :raises requests.ConnectionError: если не удалось подключиться.
+        :raises requests.Timeout: если истек таймаут запроса.
+        """
+        try:
+            async with self._async_session.request(
+                    method,
+                    url,
+                    params=params,
+                    data=json,
+                    headers=headers
+            ) as raw:
+                body = await raw.read()
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(
+                e, request=self._prepare_request(method, url, params)
+            ) from e
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(
+                e, request=self._prepare_request(method, url, params)
+            ) from e
+        response = requests.Response()
+        response.status_code = raw.status
+        response.reason = raw.reason
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response.url = str(raw.url)
+        response.encoding = raw.charset
+        response._content = body
+        response.request = self._prepare_request(method, url, params)
+        return response
+
+    @staticmethod
+    def _prepare_request(
+            method: str,
+            url: str,
+            params: Optional[dict]
+    ) -> requests.PreparedRequest:
+        """
+        :return: описание запроса для ответов и ошибок requests.
+        """
+        return requests.Request(method, url, params=params).prepare()
+
+    def _retry_error(self, error: requests.RequestException) -> bool:
+        """
+        :param error: ошибка асинхронного запроса (см. _send_async).
+        :return: True, если запрос нужно повторить: при ограничении запросов
+            - только если не удалось подключиться (см. _create_session).
+        """
+        return not self._rate_limited or \
+            isinstance(error.__cause__, aiohttp.ClientConnectorError)
+
+    def _retry_delay(self, retry: int) -> float:
+        """
+        Задержка перед повторной попыткой, как в urllib3 Retry: первая
+        попытка повторяется сразу, следующие - через
+        retry_backoff_factor * 2 ** (номер попытки - 1) плюс случайная
+        добавка до retry_backoff_jitter секунд.
+
+        :param retry: номер повторной попытки (с 1).
+        :return: задержка (в секундах).
+        """
+        if retry <= 1:
+            return 0
+        delay = self._config.retry_backoff_factor * 2 ** (retry - 1) + \
+            random.uniform(0, self._config.retry_backoff_jitter)
+        return min(delay, _RETRY_BACKOFF_MAX)
+
+    def _store_fetch(self, data: list[models.ExchangeRate]) -> RatesType:
+        """
+        Сохранение полученных журнальных записей в истории.
+
+        :param data: список журнальных записей.
+        :return: словарь курсов валют вида
+            {(from_currency_id, to_currency_id): Rate}.
+        """
+        self._last_fetch = data
+        self._history.extend(data)
+        return self._form_rages(data)
+
+    @staticmethod
+    @contextmanager
+    def _request_errors() -> Iterator[None]:
+        """
+        Преобразование ошибок requests в ошибки клиента API.
+
+        :raises ApiHTTPError: если API вернул код ошибки.
+        :raises ClientApiRequestError: ошибка при обращении к API.
+        """
+        try:
+            yield
         except requests.HTTPError as e:
             raise ApiHTTPError(e.response)
         except requests.RequestException as e:
@@ -1,15 +1,28 @@
-
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from http import HTTPStatus
 
 import requests
 
 from valutatrade_hub.parser_service import models
+from valutatrade_hub.parser_service.config import ParserConfig
 
 from .abc import ApiClientInfo, BaseApiClient
 
+#: ошибки запроса пачки, после которых остальные пачки не теряются
+_BATCH_ERRORS = (requests.RequestException, ValueError, KeyError)
+
 
 class CoinGeckoClient(BaseApiClient):
+    def __init__(self, config: ParserConfig):
+        super().__init__(config)
+        #: пачки запрашиваются параллельно, не больше coingecko_max_parallel
+        self._batch_executor = ThreadPoolExecutor(
+            max_workers=config.coingecko_max_parallel,
+            thread_name_prefix="coingecko-batch"
+        )
+
     @property
     def info(self) -> ApiClientInfo:
         return ApiClientInfo(
@@ -17,16 +30,102 @@ class CoinGeckoClient(BaseApiClient):
             url=self._config.coingecko_url
         )
 
-    def _call_api(self) -> list[models.ExchangeRate]:
-        params = {
-            "ids": ",".join((self._config.crypto_currencies.keys())),
+    @property
+    def requests_per_fetch(self) -> int:
+        return len(self._batches())
+
+    def close(self) -> None:
+        self._batch_executor.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+    def _batches(self) -> list[list[str]]:
+        """
+        Разбиение id криптовалют на пачки по coingecko_batch_size.
+
+        :return: список пачек id.
+        """
+        ids = list(self._config.crypto_currencies.keys())
+        size = self._config.coingecko_batch_size
+        return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+    def _params(self, batch: list[str]) -> dict:
+        """
+        :param batch: пачка id криптовалют.
+        :return: параметры запроса пачки.
+        """
+        return {
+            "ids": ",".join(batch),
             "vs_currencies": self._config.base_currency
         }
-        response, lead_time = self._request(
-            self._config.coingecko_url,
-            params=params
+
+    def _call_api(self) -> list[models.ExchangeRate]:
+        futures = [
+            self._batch_executor.submit(
+                self._conditional_request,
+                self._config.coingecko_url,
+                self._parse_response,
+                self._params(batch)
+            )
+            for batch in self._batches()
+        ]
+        results: list[list[models.ExchangeRate] | BaseException] = []
+        for future in futures:
+            error = future.exception()
+            results.append(error if error is not None else future.result())
+        return self._merge_batches(results)
+
+    async def _call_api_async(self) -> list[models.ExchangeRate]:
+        """
+        Асинхронный запрос к API.
+
+        Пачки запрашиваются конкурентно.
+
+        :return: список журнальных записей.
+        """
+        results = await asyncio.gather(
+            *(
+                self._conditional_request_async(
+                    self._config.coingecko_url,
+                    self._parse_response,
+                    self._params(batch)
+                )
+                for batch in self._batches()
+            ),
+            return_exceptions=True
         )
-        return self._parse_response(response, lead_time)
+        return self._merge_batches(results)
+
+    def _merge_batches(
+            self,
+            results: list[list[models.ExchangeRate] | BaseException]
+    ) -> list[models.ExchangeRate]:
+        """
+        Объединение результатов пачек.
+
+        Ошибка одной пачки логируется, а курсы остальных пачек
+        возвращаются.
+
+        :param results: журнальные записи или ошибка каждой пачки.
+        :return: журнальные записи успешных пачек.
+
+        :raises Exception: ошибка первой пачки, если все пачки завершились
+            ошибкой, или ошибка, не связанная с запросом.
+        """
+        records: list[models.ExchangeRate] = []
+        errors: list[BaseException] = []
+        for i, result in enumerate(results):
+            if not isinstance(result, BaseException):
+                records.extend(result)
+                continue
+            if not isinstance(result, _BATCH_ERRORS):
+                raise result
+            errors.append(result)
+            self._logger.error(
+                f"CoinGecko batch {i + 1}/{len(results)} failed: {result}"
+            )
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return records
 
     def _parse_response(
             self,
@@ -53,7 +152,8 @@ class CoinGeckoClient(BaseApiClient):
                 meta=models.ExchangeRateMeta(
                     raw_id=currency,
                     request_ms=request_ms,
-                    status_code=HTTPStatus(response.status_code)
+                    status_code=HTTPStatus(response.status_code),
+                    etag=response.headers.get("ETag")
                 )
             )
             rates.append(rate)
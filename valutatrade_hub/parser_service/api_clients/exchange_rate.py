@@ -1,11 +1,13 @@
+import asyncio
 from datetime import datetime
+from functools import partial
 from http import HTTPStatus
 
 import requests
 
 from valutatrade_hub.parser_service import models
 
-from .abc import ApiClientInfo, BaseApiClient
+from .abc import ApiClientInfo, BaseApiClient, ParseResponseType
 
 
 class ExchangeRateApiClient(BaseApiClient):
@@ -16,24 +18,83 @@ class ExchangeRateApiClient(BaseApiClient):
             url=self._config.exchangerate_api_url
         )
 
-    def _call_api(self) -> list[models.ExchangeRate]:
+    @property
+    def requests_per_fetch(self) -> int:
+        if self._config.exchangerate_single_request:
+            return 1
+        return len(self._currencies())
+
+    def _currencies(self) -> list[str]:
+        """
+        :return: список валют, для которых запрашиваются курсы.
+        """
         currencies = {
             self._config.base_currency,
             *self._config.fiat_currencies
         }
-        currencies = list(currencies)
-        result: list[models.ExchangeRate] = []
-        for i, from_currency in enumerate(currencies):
-            url = (f"{self._config.exchangerate_api_url}/"
-                   f"{self._config.exchangerate_api_key}"
-                   f"/latest/{from_currency}")
-            response, lead_time = self._request(url)
-            rates = self._parse_response(
-                response, lead_time, from_currency, currencies[i+1:]
+        return list(currencies)
+
+    def _url(self, from_currency: str) -> str:
+        """
+        :param from_currency: исходная валюта.
+        :return: url запроса курсов исходной валюты.
+        """
+        return (f"{self._config.exchangerate_api_url}/"
+                f"{self._config.exchangerate_api_key}"
+                f"/latest/{from_currency}")
+
+    def _request_plan(self) -> list[tuple[str, ParseResponseType]]:
+        """
+        Формирование списка запросов.
+
+        В режиме одного запроса запрашиваются только курсы базовой валюты
+        (см. _derive_cross_rates), иначе - курсы каждой валюты.
+
+        :return: список вида [(url запроса, функция разбора ответа)].
+        """
+        currencies = self._currencies()
+        if self._config.exchangerate_single_request:
+            base_currency = self._config.base_currency
+            return [(
+                self._url(base_currency),
+                partial(
+                    self._derive_cross_rates,
+                    base_currency=base_currency,
+                    currencies=currencies
+                )
+            )]
+        return [
+            (
+                self._url(from_currency),
+                partial(
+                    self._parse_response,
+                    from_currency=from_currency,
+                    to_currencies=currencies[i+1:]
+                )
             )
-            result.extend(rates)
+            for i, from_currency in enumerate(currencies)
+        ]
+
+    def _call_api(self) -> list[models.ExchangeRate]:
+        result: list[models.ExchangeRate] = []
+        for url, parse in self._request_plan():
+            result.extend(self._conditional_request(url, parse))
         return result
 
+    async def _call_api_async(self) -> list[models.ExchangeRate]:
+        """
+        Асинхронный запрос к API.
+
+        Запросы по всем исходным валютам выполняются конкурентно.
+
+        :return: список журнальных записей.
+        """
+        responses = await asyncio.gather(*(
+            self._conditional_request_async(url, parse)
+            for url, parse in self._request_plan()
+        ))
+        return [record for records in responses for record in records]
+
     @staticmethod
     def _parse_response(
             response: requests.Response,
@@ -68,8 +129,56 @@ class ExchangeRateApiClient(BaseApiClient):
                 meta=models.ExchangeRateMeta(
                     raw_id=currency,
                     request_ms=request_ms,
-                    status_code=HTTPStatus(response.status_code)
+                    status_code=HTTPStatus(response.status_code),
+                    etag=response.headers.get("ETag")
                 )
             )
             rates.append(rate)
         return rates
+
+    @staticmethod
+    def _derive_cross_rates(
+            response: requests.Response,
+            request_ms: int,
+            base_currency: str,
+            currencies: list[str]
+    ) -> list[models.ExchangeRate]:
+        """
+        Вычисление всех курсов по ответу для базовой валюты.
+
+        Ответ содержит курсы базовой валюты ко всем валютам, поэтому курс
+        from -> to вычисляется как rates[to] / rates[from]. Формируются те же
+        пары, что и при запросе по каждой валюте (см. _call_api).
+
+        :param response: ответ от API для базовой валюты.
+        :param request_ms: время выполнения запроса.
+        :param base_currency: базовая валюта.
+        :param currencies: список валют.
+
+        :return: список курсов валют для журнала.
+        """
+        now = datetime.now()
+        status_code = HTTPStatus(response.status_code)
+        etag = response.headers.get("ETag")
+        base_rates: dict[str, float] = response.json()["conversion_rates"]
+        base_rates[base_currency] = 1
+        currencies = [
+            currency for currency in currencies if base_rates.get(currency)
+        ]
+        return [
+            models.ExchangeRate(
+                from_currency=from_currency,
+                to_currency=to_currency,
+                rate=base_rates[to_currency] / base_rates[from_currency],
+                timestamp=now,
+                source="ExchangeRateApi",
+                meta=models.ExchangeRateMeta(
+                    raw_id=to_currency,
+                    request_ms=request_ms,
+                    status_code=status_code,
+                    etag=etag
+                )
+            )
+            for i, from_currency in enumerate(currencies)
+            for to_currency in currencies[i+1:]
+        ]
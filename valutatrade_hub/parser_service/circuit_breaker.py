@@ -0,0 +1,147 @@
+import threading
+from collections.abc import Callable
+from datetime import datetime
+from enum import Enum
+from time import monotonic
+from typing import NamedTuple
+
+
+class CircuitState(Enum):
+    #: запросы выполняются
+    closed = "closed"
+    #: запросы не выполняются
+    open = "open"
+    #: выполняется пробный запрос
+    half_open = "half_open"
+
+
+class CircuitHealth(NamedTuple):
+    """
+    Состояние автоматического выключателя для мониторинга.
+    """
+    state: CircuitState
+    #: количество ошибок подряд
+    consecutive_failures: int
+    #: время последнего перехода в состояние open
+    opened_at: datetime | None
+    #: последняя ошибка
+    last_error: str | None
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель запросов к API.
+
+    В состоянии closed запросы выполняются. После failure_threshold ошибок
+    подряд выключатель переходит в состояние open, и запросы не выполняются.
+    Запрос дольше latency_threshold секунд считается ошибкой. Через
+    reset_timeout секунд выключатель переходит в состояние half_open и
+    пропускает один пробный запрос: при успехе выключатель закрывается, при
+    ошибке снова открывается.
+
+    :param failure_threshold: количество ошибок подряд для открытия.
+    :param latency_threshold: максимальное время успешного запроса
+        (в секундах).
+    :param reset_timeout: время до пробного запроса (в секундах).
+    :param on_state_change: функция, вызываемая при смене состояния с
+        новым состоянием выключателя.
+    """
+    def __init__(
+            self,
+            failure_threshold: int,
+            latency_threshold: float,
+            reset_timeout: float,
+            on_state_change: Callable[[CircuitHealth], None] | None = None
+    ):
+        self._failure_threshold = failure_threshold
+        self._latency_threshold = latency_threshold
+        self._reset_timeout = reset_timeout
+        self._on_state_change = on_state_change
+        self._lock = threading.Lock()
+        self._state = CircuitState.closed
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._opened_at_dt: datetime | None = None
+        self._last_error: str | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def health(self) -> CircuitHealth:
+        """
+        :return: состояние выключателя.
+        """
+        with self._lock:
+            return self._health()
+
+    def _health(self) -> CircuitHealth:
+        return CircuitHealth(
+            self._state, self._failures, self._opened_at_dt, self._last_error
+        )
+
+    def allow(self) -> bool:
+        """
+        Проверка, можно ли выполнить запрос.
+
+        :return: True, если запрос можно выполнить.
+        """
+        with self._lock:
+            if self._state is CircuitState.closed:
+                return True
+            if self._state is CircuitState.half_open:
+                # пробный запрос уже выполняется
+                return False
+            if monotonic() - self._opened_at < self._reset_timeout:
+                return False
+            health = self._set_state(CircuitState.half_open)
+        self._notify(health)
+        return True
+
+    def record_success(self, duration: float) -> None:
+        """
+        Регистрация успешного запроса.
+
+        :param duration: время выполнения запроса (в секундах).
+        :return: None.
+        """
+        if duration > self._latency_threshold:
+            self.record_failure(
+                f"Request took {duration:.2f} s "
+                f"(threshold {self._latency_threshold} s)"
+            )
+            return
+        with self._lock:
+            self._failures = 0
+            if self._state is CircuitState.closed:
+                return
+            health = self._set_state(CircuitState.closed)
+        self._notify(health)
+
+    def record_failure(self, error: str) -> None:
+        """
+        Регистрация ошибки запроса.
+
+        :param error: описание ошибки.
+        :return: None.
+        """
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            if self._state is CircuitState.open or (
+                    self._state is CircuitState.closed
+                    and self._failures < self._failure_threshold
+            ):
+                return
+            self._opened_at = monotonic()
+            self._opened_at_dt = datetime.now()
+            health = self._set_state(CircuitState.open)
+        self._notify(health)
+
+    def _set_state(self, state: CircuitState) -> CircuitHealth:
+        self._state = state
+        return self._health()
+
+    def _notify(self, health: CircuitHealth) -> None:
+        if self._on_state_change is not None:
+            self._on_state_change(health)
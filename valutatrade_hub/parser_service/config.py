@@ -1,6 +1,10 @@
+from datetime import timedelta
 from pathlib import Path
 
 from valutatrade_hub.infra import JsonSettingsLoader, Parameter
+from valutatrade_hub.infra.validator import field_validator
+
+from .rate_limiter import RateLimit
 
 
 class ConfigError(Exception):
@@ -16,6 +20,9 @@ class ParserConfig(JsonSettingsLoader):
         default="https://v6.exchangerate-api.com/v6"
     )
     exchangerate_api_key: str = Parameter()
+    #: режим одного запроса: курсы запрашиваются только для базовой валюты,
+    #: остальные курсы вычисляются локально
+    exchangerate_single_request: bool = Parameter(ptype=bool, default=False)
     #: базовая валюта
     base_currency: str = Parameter(default="USD")
     #: валюты, которые будут использоваться:
@@ -31,9 +38,135 @@ class ParserConfig(JsonSettingsLoader):
             "solana": "SOL"
         }
     )
+    #: количество криптовалют в одном запросе к CoinGecko
+    coingecko_batch_size: int = Parameter(ptype=int, default=100)
+    #: максимальное количество параллельных запросов к CoinGecko
+    coingecko_max_parallel: int = Parameter(ptype=int, default=4)
     #: таймаут запроса
     request_timeout: int = Parameter(ptype=int, default=10)
+    #: максимальное количество keep-alive соединений в пуле клиента
+    http_pool_size: int = Parameter(ptype=int, default=10)
+    #: максимальное количество повторных попыток запроса
+    retry_total: int = Parameter(ptype=int, default=3)
+    #: множитель экспоненциальной задержки между попытками (в секундах)
+    retry_backoff_factor: float = Parameter(ptype=float, default=0.5)
+    #: максимальная случайная добавка к задержке (в секундах)
+    retry_backoff_jitter: float = Parameter(ptype=float, default=0.5)
+    #: коды ответа, при которых запрос повторяется
+    retry_status_codes: tuple = Parameter(
+        ptype=tuple,
+        default=(429, 500, 502, 503, 504)
+    )
+    #: интервал фонового обновления курсов (в секундах)
+    refresh_interval: int = Parameter(ptype=int, default=60)
+    #: максимальная случайная задержка фонового обновления (в секундах)
+    refresh_jitter: float = Parameter(ptype=float, default=5)
+    #: крайний срок опроса всех клиентов при обновлении (в секундах)
+    update_deadline: int = Parameter(ptype=int, default=60)
+    #: количество ошибок подряд, после которого клиент не опрашивается
+    breaker_failure_threshold: int = Parameter(ptype=int, default=3)
+    #: время запроса (в секундах), после которого запрос считается ошибкой
+    breaker_latency_threshold: float = Parameter(ptype=float, default=5)
+    #: время (в секундах), через которое клиент опрашивается пробным запросом
+    breaker_reset_timeout: int = Parameter(ptype=int, default=30)
+    #: ограничения запросов к источникам вида {имя источника: {"requests":
+    #: количество запросов, "period": период в секундах, "burst":
+    #: максимальное количество запросов подряд}}
+    rate_limits: dict = Parameter(ptype=dict, default={})
+    #: максимальная задержка опроса источника из-за ограничения запросов
+    #: (в секундах); если ждать дольше, то опрос пропускается
+    rate_limit_max_delay: float = Parameter(ptype=float, default=10)
     #: максимальное количество записей в истории
     max_history_len: int = Parameter(ptype=int, default=100)
+    #: максимальное количество записей в сегменте постоянной истории
+    history_segment_size: int = Parameter(ptype=int, default=100000)
+    #: время жизни курсов источника (в секундах) вида
+    #: {имя источника: TTL}. Для источников, которых нет в словаре,
+    #: используется интервал обновления курсов из конфигурации приложения
+    source_ttl: dict = Parameter(ptype=dict, default={})
+    #: время жизни курсов пары (в секундах) вида {"FROM_TO": TTL};
+    #: переопределяет время жизни курсов источника
+    pair_ttl: dict = Parameter(ptype=dict, default={})
     data_path: Path = Parameter(ptype=Path)
 
+    @field_validator("coingecko_batch_size")
+    def _validate_coingecko_batch_size(self, value: int) -> int:
+        """Валидатор для параметра coingecko_batch_size."""
+        return _validate_positive(value, "coingecko_batch_size")
+
+    @field_validator("coingecko_max_parallel")
+    def _validate_coingecko_max_parallel(self, value: int) -> int:
+        """Валидатор для параметра coingecko_max_parallel."""
+        return _validate_positive(value, "coingecko_max_parallel")
+
+    @field_validator("source_ttl")
+    def _validate_source_ttl(self, value: dict) -> dict[str, timedelta]:
+        """Валидатор для параметра source_ttl."""
+        return _validate_ttl(value, "source_ttl")
+
+    @field_validator("pair_ttl")
+    def _validate_pair_ttl(self, value: dict) -> dict[str, timedelta]:
+        """Валидатор для параметра pair_ttl."""
+        return _validate_ttl(value, "pair_ttl")
+
+    @field_validator("rate_limits")
+    def _validate_rate_limits(self, value: dict) -> dict[str, RateLimit]:
+        """Валидатор для параметра rate_limits."""
+        limits = {}
+        for source, limit in value.items():
+            requests = limit.get("requests")
+            period = limit.get("period")
+            burst = limit.get("burst", requests)
+            if not all(
+                    isinstance(item, int | float)
+                    and not isinstance(item, bool) and item > 0
+                    for item in (requests, period, burst)
+            ):
+                raise ValueError(
+                    f"Некорректное значение для параметра \"rate_limits\" "
+                    f"(\"{source}\"). Значения requests, period и burst "
+                    f"должны быть больше 0."
+                )
+            limits[source] = RateLimit(int(requests), period, int(burst))
+        return limits
+
+
+def _validate_positive(value: int, name: str) -> int:
+    """
+    Проверка положительного целого параметра.
+
+    :param value: значение параметра.
+    :param name: имя параметра.
+    :return: значение параметра.
+
+    :raises ValueError: если значение меньше 1.
+    """
+    if value < 1:
+        raise ValueError(
+            f"Некорректное значение для параметра \"{name}\". "
+            f"Значение должно быть больше 0."
+        )
+    return value
+
+
+def _validate_ttl(value: dict, name: str) -> dict[str, timedelta]:
+    """
+    Проверка словаря времен жизни курсов.
+
+    :param value: словарь вида {ключ: TTL в секундах}.
+    :param name: имя параметра.
+    :return: словарь вида {ключ: TTL}.
+
+    :raises ValueError: если TTL не является положительным числом.
+    """
+    ttls = {}
+    for key, seconds in value.items():
+        if isinstance(seconds, bool) or \
+                not isinstance(seconds, int | float) or seconds <= 0:
+            raise ValueError(
+                f"Некорректное значение для параметра \"{name}\" "
+                f"(\"{key}\"). Значение должно быть больше 0."
+            )
+        ttls[key] = timedelta(seconds=seconds)
+    return ttls
+
@@ -0,0 +1,691 @@
+import json
+import logging
+import socket
+import socketserver
+import threading
+from collections.abc import Callable, Mapping
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from .config import ParserConfig
+from .exception import ApiRequestError
+from .models import RatesSnapshot, SnapshotPublisher, Storage
+from .models.history_store import HistoryStore
+from .models.rate_history import RatesHistoryType
+from .updater import RatesStorageType, RatesUpdater
+
+#: интервал проверки остановки сервера подписчиками (в секундах)
+_SUBSCRIBE_POLL_INTERVAL = 1
+#: задержка повторного подключения к демону курсов (в секундах)
+_RECONNECT_DELAY = 5
+
+
+class RatesDaemonError(Exception):
+    pass
+
+
+class RatesDaemonCommand(Enum):
+    #: подписка на новые версии хранилища курсов
+    subscribe = "subscribe"
+    #: обновление курсов (см. RatesUpdater.run_update)
+    update = "update"
+    #: обновление устаревших курсов (см. RatesUpdater.refresh_stale)
+    refresh_stale = "refresh_stale"
+    #: фоновое обновление устаревших курсов (см. RatesUpdater.revalidate)
+    revalidate = "revalidate"
+    #: источники с устаревшими курсами (см. RatesUpdater.stale_sources);
+    #: подписчики получают время устаревания курсов вместе с хранилищем
+    stale_sources = "stale_sources"
+    #: состояние клиентов (см. RatesUpdater.health)
+    health = "health"
+
+
+class RatesDaemonJsonKeys(Enum):
+    command = "command"
+    source = "source"
+    result = "result"
+    error_type = "error_type"
+    error = "error"
+    version = "version"
+    storage = "storage"
+    updated = "updated"
+    sources = "sources"
+    stale_at = "stale_at"
+    health = "health"
+
+
+def _encode(message: dict) -> bytes:
+    """
+    Сериализация сообщения протокола: одна строка JSON.
+
+    :param message: сообщение.
+    :return: байты сообщения.
+    """
+    return json.dumps(message).encode() + b"\n"
+
+
+class RatesServer:
+    """
+    Сервер курсов валют демона.
+
+    Раздает хранилище курсов валют сервиса обновления по локальному
+    Unix-сокету. Протокол - строки JSON: клиент отправляет одну команду (см.
+    RatesDaemonCommand) и получает один ответ. Подписчик (команда subscribe)
+    получает текущее хранилище и затем каждую новую версию, пока не
+    отключится. Вместе с версиями и при каждом изменении подписчику
+    отправляется время устаревания курсов источников (см.
+    RatesUpdater.stale_at), поэтому подписчик определяет устаревшие
+    источники без запросов к демону.
+
+    :param updater: сервис обновления курсов валют.
+    :param socket_path: путь к Unix-сокету.
+    :param default_ttl: время жизни курсов источников, для которых оно не
+        задано в конфигурации парсера (source_ttl).
+    """
+    def __init__(
+            self,
+            updater: RatesUpdater,
+            socket_path: Path,
+            default_ttl: timedelta
+    ):
+        self._updater = updater
+        self._socket_path = socket_path
+        self._default_ttl = default_ttl
+        self._stopped = threading.Event()
+        self._server: _UnixServer | None = None
+        #: последняя сериализованная версия вида (номер версии, байты)
+        self._encoded: tuple[int, bytes] | None = None
+        self._logger = logging.getLogger("rates-server")
+
+    def serve_forever(self) -> None:
+        """
+        Обработка запросов до вызова stop.
+
+        :return: None.
+
+        :raises RatesDaemonError: если сокет уже используется другим
+            процессом.
+        """
+        self._remove_stale_socket()
+        self._stopped.clear()
+        self._server = _UnixServer(str(self._socket_path), self)
+        self._logger.info(f"Serving rates on {self._socket_path}")
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        """
+        Остановка сервера из другого потока.
+
+        :return: None.
+        """
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def close(self) -> None:
+        """
+        Закрытие сокета сервера.
+
+        :return: None.
+        """
+        self._stopped.set()
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            self._socket_path.unlink(missing_ok=True)
+
+    def _remove_stale_socket(self) -> None:
+        """
+        Удаление сокета, оставшегося от завершенного процесса.
+
+        :return: None.
+
+        :raises RatesDaemonError: если сокет принимает подключения.
+        """
+        if not self._socket_path.exists():
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(str(self._socket_path))
+            except OSError:
+                self._socket_path.unlink()
+                return
+        raise RatesDaemonError(
+            f"Сокет {self._socket_path} уже используется другим процессом"
+        )
+
+    def handle(
+            self,
+            request: dict,
+            send: Callable[[bytes], None]
+    ) -> None:
+        """
+        Обработка запроса клиента.
+
+        :param request: запрос.
+        :param send: функция отправки ответа.
+        :return: None.
+        """
+        keys = RatesDaemonJsonKeys
+        try:
+            command = RatesDaemonCommand(request[keys.command.value])
+        except (KeyError, ValueError) as e:
+            send(_encode({
+                keys.result.value: "error",
+                keys.error_type.value: ValueError.__name__,
+                keys.error.value: f"Неизвестная команда: {e}"
+            }))
+            return
+        if command is RatesDaemonCommand.subscribe:
+            self._subscribe(send)
+            return
+        try:
+            response = self._execute(command, request)
+        except Exception as e:
+            self._logger.error(f"Command {command.value} failed: {e}")
+            response = {
+                keys.result.value: "error",
+                keys.error_type.value: e.__class__.__name__,
+                keys.error.value: str(e)
+            }
+        else:
+            response[keys.result.value] = "ok"
+        send(_encode(response))
+
+    def _execute(self, command: RatesDaemonCommand, request: dict) -> dict:
+        """
+        Выполнение команды.
+
+        :param command: команда.
+        :param request: запрос.
+        :return: ответ без результата выполнения.
+        """
+        keys = RatesDaemonJsonKeys
+        updater = self._updater
+        storage = updater.storage
+        if command is RatesDaemonCommand.update:
+            updater.run_update(request.get(keys.source.value))
+            return self._storage_message()
+        if command is RatesDaemonCommand.refresh_stale:
+            updated = updater.refresh_stale(storage, self._default_ttl)
+            return self._storage_message() | {keys.updated.value: updated}
+        if command is RatesDaemonCommand.revalidate:
+            return {
+                keys.updated.value:
+                    updater.revalidate(storage, self._default_ttl)
+            }
+        if command is RatesDaemonCommand.stale_sources:
+            return {
+                keys.sources.value: sorted(
+                    updater.stale_sources(storage, self._default_ttl)
+                )
+            }
+        return {
+            keys.health.value: {
+                name: {
+                    "state": health.state.value,
+                    "consecutive_failures": health.consecutive_failures,
+                    "opened_at": health.opened_at.isoformat()
+                    if health.opened_at else None,
+                    "last_error": health.last_error
+                }
+                for name, health in updater.health().items()
+            }
+        }
+
+    def _storage_message(self) -> dict:
+        """
+        :return: сообщение с текущим хранилищем курсов валют.
+        """
+        snapshot = self._updater.snapshot
+        if snapshot is None:
+            return {}
+        return {
+            RatesDaemonJsonKeys.version.value: snapshot.version,
+            RatesDaemonJsonKeys.storage.value: snapshot.storage.dump()
+        }
+
+    def _subscribe(self, send: Callable[[bytes], None]) -> None:
+        """
+        Отправка подписчику новых версий хранилища курсов валют и времени
+        устаревания курсов источников.
+
+        Время устаревания меняется с новой версией хранилища или после
+        опроса клиентов, поэтому оно проверяется с интервалом ожидания
+        версий и отправляется, только если изменилось.
+
+        Выполняется до остановки сервера или отключения подписчика.
+
+        :param send: функция отправки сообщения.
+        :return: None.
+        """
+        updater = self._updater
+        version = 0
+        sent_stale_at: Mapping[str, datetime] | None = None
+        while not self._stopped.is_set():
+            snapshot = updater.publisher.wait(
+                version, _SUBSCRIBE_POLL_INTERVAL
+            )
+            if snapshot is not None:
+                send(self._encode_snapshot(snapshot))
+                version = snapshot.version
+            stale_at = updater.stale_at(updater.storage, self._default_ttl)
+            if stale_at != sent_stale_at:
+                send(_encode({
+                    RatesDaemonJsonKeys.stale_at.value: {
+                        name: at.isoformat() for name, at in stale_at.items()
+                    }
+                }))
+                sent_stale_at = stale_at
+
+    def _encode_snapshot(self, snapshot: RatesSnapshot) -> bytes:
+        """
+        Сериализация версии хранилища.
+
+        Версия сериализуется один раз для всех подписчиков.
+
+        :param snapshot: версия хранилища.
+        :return: байты сообщения.
+        """
+        encoded = self._encoded
+        if encoded is None or encoded[0] != snapshot.version:
+            encoded = (snapshot.version, _encode({
+                RatesDaemonJsonKeys.version.value: snapshot.version,
+                RatesDaemonJsonKeys.storage.value: snapshot.storage.dump()
+            }))
+            self._encoded = encoded
+        return encoded[1]
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "_UnixServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = {}
+        try:
+            self.server.rates_server.handle(request, self.wfile.write)
+        except OSError:
+            # клиент отключился
+            pass
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, rates_server: RatesServer):
+        self.rates_server = rates_server
+        super().__init__(socket_path, _RequestHandler)
+
+
+class RatesSubscriber:
+    """
+    Клиент демона курсов валют.
+
+    Используется ядром приложения вместо RatesUpdater, когда курсы
+    обновляет отдельный демон (см. RatesServer): каждая новая версия
+    хранилища демона публикуется локально, а обновление курсов выполняется
+    демоном. Время жизни курсов определяет демон, поэтому параметр
+    default_ttl методов не используется: устаревшие источники
+    определяются по времени устаревания, полученному по подписке.
+
+    Если демон недоступен, то курсы не обновляются (без обращений к
+    сокету), а ядро читает их из файла, который записывает демон; подписка
+    восстанавливается автоматически.
+
+    Демон не передает историю курсов, поэтому первая версия хранилища
+    дополняется постоянной историей, которую дописывает демон (см.
+    HistoryStore), а следующие версии - полученными курсами.
+
+    :param config: конфигурация парсера.
+    :param socket_path: путь к Unix-сокету демона.
+    """
+    def __init__(self, config: ParserConfig, socket_path: Path):
+        self._config = config
+        self._socket_path = socket_path
+        self._publisher = SnapshotPublisher()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._socket: socket.socket | None = None
+        self._connected = False
+        #: время устаревания курсов источников, полученное от демона
+        self._stale_at: dict[str, datetime] = {}
+        #: номер сообщения с временем устаревания курсов
+        self._stale_at_version = 0
+        #: устаревшие источники, для которых запущено фоновое обновление,
+        #: вида (номер сообщения с временем устаревания, источники)
+        self._revalidated: tuple[int, frozenset[str]] | None = None
+        self._logger = logging.getLogger("rates-subscriber")
+        self._history_store = HistoryStore(
+            config.data_path / "history",
+            config.history_segment_size,
+            read_only=True
+        )
+
+    @property
+    def storage(self) -> Storage | None:
+        snapshot = self._publisher.current
+        return snapshot.storage if snapshot else None
+
+    @property
+    def snapshot(self) -> RatesSnapshot | None:
+        """
+        :return: последняя полученная от демона версия хранилища.
+        """
+        return self._publisher.current
+
+    @property
+    def publisher(self) -> SnapshotPublisher:
+        """
+        :return: публикатор версий хранилища курсов валют.
+        """
+        return self._publisher
+
+    @property
+    def written(self) -> None:
+        """
+        :return: None: файлы записывает процесс демона (см.
+            RatesUpdater.written).
+        """
+        return None
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True, если есть подписка на демон (курсы обновляются в
+            фоне).
+        """
+        return self._connected
+
+    def start(self, default_ttl: timedelta | None = None) -> None:
+        """
+        Подписка на новые версии хранилища демона в фоновом потоке.
+
+        :param default_ttl: не используется.
+        :return: None.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="rates-subscriber", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Отмена подписки.
+
+        :return: None.
+        """
+        self._stop_event.set()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(_RECONNECT_DELAY)
+            self._thread = None
+
+    def run_update(self, source: str | None = None) -> None:
+        """
+        Обновление курсов демоном.
+
+        :param source: имя класса клиента. Если не указано, то будут опрошены
+            все клиенты.
+
+        :return: None.
+
+        :raises ValueError: если клиент не найден.
+        :raises ApiRequestError: если демон недоступен или не смог обновить
+            курсы.
+        """
+        self._publish(self._request(
+            RatesDaemonCommand.update,
+            {RatesDaemonJsonKeys.source.value: source}
+        ))
+
+    def refresh_stale(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> bool:
+        """
+        Обновление демоном курсов устаревших источников.
+
+        :param storage: не используется.
+        :param default_ttl: не используется.
+        :return: True, если обновление выполнялось; False, если нет
+            подписки на демон.
+        """
+        if not self._connected:
+            return False
+        response = self._try_request(RatesDaemonCommand.refresh_stale)
+        if response is None:
+            return False
+        self._publish(response)
+        return response[RatesDaemonJsonKeys.updated.value]
+
+    def revalidate(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> bool:
+        """
+        Запуск демоном фонового обновления устаревших курсов.
+
+        Для одних и тех же устаревших источников обновление запрашивается
+        один раз, пока демон не пришлет новое время устаревания курсов.
+
+        :param storage: не используется.
+        :param default_ttl: не используется.
+        :return: True, если обновление запущено.
+        """
+        stale = frozenset(self.stale_sources(storage, default_ttl))
+        revalidated = (self._stale_at_version, stale)
+        if not self._connected or not stale \
+                or revalidated == self._revalidated:
+            return False
+        self._revalidated = revalidated
+        response = self._try_request(RatesDaemonCommand.revalidate)
+        return bool(response and response[RatesDaemonJsonKeys.updated.value])
+
+    def stale_sources(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> set[str]:
+        """
+        Получение имен источников с устаревшими курсами по времени
+        устаревания, полученному от демона (без обращения к демону).
+
+        :param storage: не используется.
+        :param default_ttl: не используется.
+        :return: множество имен источников (пустое, если время устаревания
+            еще не получено).
+        """
+        now = datetime.now()
+        return {name for name, at in self._stale_at.items() if now >= at}
+
+    def health(self) -> dict[str, dict]:
+        """
+        Получение состояния клиентов демона (см. RatesUpdater.health).
+
+        :return: словарь вида {имя источника: состояние клиента}.
+
+        :raises ApiRequestError: если демон недоступен.
+        """
+        return self._request(RatesDaemonCommand.health)[
+            RatesDaemonJsonKeys.health.value
+        ]
+
+    def _connect(self, timeout: float | None) -> socket.socket:
+        """
+        Подключение к демону.
+
+        :param timeout: таймаут операций сокета (в секундах).
+        :return: сокет.
+
+        :raises OSError: если не удалось подключиться.
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(self._socket_path))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(
+            self,
+            command: RatesDaemonCommand,
+            params: dict | None = None
+    ) -> dict[str, Any]:
+        """
+        Выполнение команды демоном.
+
+        :param command: команда.
+        :param params: параметры команды.
+        :return: ответ демона.
+
+        :raises ValueError: если демон отклонил параметры команды.
+        :raises ApiRequestError: если демон недоступен или команда
+            завершилась ошибкой.
+        """
+        keys = RatesDaemonJsonKeys
+        request = {keys.command.value: command.value} | (params or {})
+        try:
+            # обновление курсов демоном ограничено крайним сроком опроса
+            with self._connect(self._config.update_deadline + 1) as sock:
+                sock.sendall(_encode(request))
+                with sock.makefile("rb") as file:
+                    line = file.readline()
+            response = json.loads(line)
+        except (OSError, ValueError) as e:
+            raise ApiRequestError(f"Демон курсов недоступен: {e}")
+        if response.get(keys.result.value) != "ok":
+            error = response.get(keys.error.value)
+            if response.get(keys.error_type.value) == ValueError.__name__:
+                raise ValueError(error)
+            raise ApiRequestError(error)
+        return response
+
+    def _try_request(
+            self,
+            command: RatesDaemonCommand
+    ) -> dict[str, Any] | None:
+        """
+        Выполнение команды демоном с логированием ошибок.
+
+        :param command: команда.
+        :return: ответ демона или None, если команда не выполнена.
+        """
+        try:
+            return self._request(command)
+        except (ValueError, ApiRequestError) as e:
+            self._logger.error(f"Command {command.value} failed: {e}")
+            return None
+
+    def _listen(self) -> None:
+        """
+        Получение новых версий хранилища от демона.
+
+        Выполняется в фоновом потоке до вызова stop; при потере соединения
+        подключение повторяется.
+
+        :return: None.
+        """
+        request = _encode({
+            RatesDaemonJsonKeys.command.value:
+                RatesDaemonCommand.subscribe.value
+        })
+        # недоступность демона логируется один раз, а не при каждой попытке
+        reported = False
+        while not self._stop_event.is_set():
+            try:
+                with self._connect(None) as sock:
+                    self._socket = sock
+                    sock.sendall(request)
+                    self._connected = True
+                    reported = False
+                    self._logger.info(
+                        f"Subscribed to rates daemon at {self._socket_path}"
+                    )
+                    with sock.makefile("rb") as file:
+                        for line in file:
+                            self._publish(json.loads(line))
+            except (OSError, ValueError) as e:
+                if not reported and not self._stop_event.is_set():
+                    self._logger.warning(
+                        f"Rates daemon at {self._socket_path} is "
+                        f"unavailable: {e}"
+                    )
+                    reported = True
+            finally:
+                self._socket = None
+                self._connected = False
+            self._stop_event.wait(_RECONNECT_DELAY)
+
+    def _publish(self, message: dict[str, Any]) -> None:
+        """
+        Публикация хранилища и времени устаревания курсов, полученных от
+        демона.
+
+        Хранилище не старее текущего не публикуется.
+
+        :param message: сообщение демона.
+        :return: None.
+        """
+        stale_at = message.get(RatesDaemonJsonKeys.stale_at.value)
+        if stale_at is not None:
+            self._stale_at = {
+                name: datetime.fromisoformat(at)
+                for name, at in stale_at.items()
+            }
+            self._stale_at_version += 1
+        data = message.get(RatesDaemonJsonKeys.storage.value)
+        if data is None:
+            return
+        received = Storage.load(data)
+        current = self._publisher.current
+        if current and current.storage.last_refresh >= received.last_refresh:
+            return
+
+        def build(current: Storage | None) -> Storage:
+            if current is None:
+                return Storage(
+                    pairs=dict(received.pairs),
+                    last_refresh=received.last_refresh,
+                    history=self._load_history(),
+                    max_history_len=self._config.max_history_len
+                )
+            if current.last_refresh >= received.last_refresh:
+                return current
+            return current.merge(dict(received.pairs), received.last_refresh)
+
+        self._publisher.publish(build)
+
+    def _load_history(self) -> RatesHistoryType:
+        """
+        Загрузка последних курсов пар из постоянной истории демона.
+
+        :return: истории курсов; пустой словарь, если не удалось прочитать
+            постоянную историю.
+        """
+        try:
+            return self._history_store.rate_histories(
+                self._config.max_history_len
+            )
+        except (OSError, ValueError) as e:
+            self._logger.error(f"Failed to load rates history: {e}")
+            return {}
@@ -1,12 +1,17 @@
 from .api_client_info import ApiClientInfo
 from .exchange_rate import ExchangeRate, ExchangeRateMeta
 from .rate import Rate
+from .rate_vector import RateVector
+from .snapshot import RatesSnapshot, SnapshotPublisher
 from .storage import Storage
 
 __all__ = [
     "Rate",
+    "RateVector",
     "ExchangeRate",
     "ExchangeRateMeta",
     "Storage",
+    "RatesSnapshot",
+    "SnapshotPublisher",
     "ApiClientInfo"
 ]
\ No newline at end of file
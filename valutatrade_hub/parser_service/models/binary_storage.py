@@ -0,0 +1,347 @@
+import mmap
+import struct
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+
+from ..exception import UnknownRateError
+from .rate import Rate, RatesType, parse_rate_key, rate_key
+from .rate_vector import RateVector
+from .storage import RateDictType, Storage
+
+#: сигнатура файла
+MAGIC = b"VTRB"
+#: версия формата
+FORMAT_VERSION = 2
+#: заголовок: сигнатура, версия формата, резерв, количество валют,
+#: количество источников, количество записей, время обновления курсов
+_HEADER = struct.Struct("<4sHHIIId")
+#: размер поля кода валюты (в байтах)
+_CURRENCY_SIZE = 16
+#: код валюты в таблице валют
+_CURRENCY = struct.Struct(f"<{_CURRENCY_SIZE}s")
+#: размер поля названия источника (в байтах)
+_SOURCE_NAME_SIZE = 32
+#: источник в таблице источников: название, время обновления самого
+#: старого курса источника
+_SOURCE = struct.Struct(f"<{_SOURCE_NAME_SIZE}sd")
+#: запись о курсе: индекс конвертируемой валюты, индекс целевой валюты,
+#: курс, время обновления курса, индекс источника
+_RECORD = struct.Struct("<HHddH")
+#: ключ записи: индекс конвертируемой валюты, индекс целевой валюты
+_RECORD_KEY = struct.Struct("<HH")
+
+
+class BinaryStorageError(Exception):
+    pass
+
+
+def _encode_name(name: str, size: int, kind: str) -> bytes:
+    """
+    Кодирование кода валюты или названия источника для поля фиксированного
+    размера.
+
+    :param name: код валюты или название источника.
+    :param size: размер поля (в байтах).
+    :param kind: что кодируется (для сообщения об ошибке).
+    :return: закодированное значение.
+
+    :raises BinaryStorageError: если значение не помещается в поле.
+    """
+    encoded = name.encode()
+    if len(encoded) > size:
+        raise BinaryStorageError(
+            f"{kind} \"{name}\" длиннее {size} байт"
+        )
+    return encoded
+
+
+def dump_binary(storage: Storage) -> bytes:
+    """
+    Сериализация хранилища в двоичный формат.
+
+    Файл состоит из заголовка, таблицы кодов валют, таблицы источников и
+    записей о курсах фиксированного размера, отсортированных по индексам
+    валют. Индексы валют и источников - позиции в соответствующих таблицах.
+
+    :param storage: хранилище курсов валют.
+    :return: двоичное представление хранилища.
+
+    :raises BinaryStorageError: если код валюты или название источника не
+        помещается в поле таблицы.
+    """
+    pairs = [
+        (*parse_rate_key(key), rate) for key, rate in storage.pairs.items()
+    ]
+    codes = sorted({code for fc, tc, _ in pairs for code in (fc, tc)})
+    sources = sorted({rate.source for *_, rate in pairs})
+    code_indexes = {code: i for i, code in enumerate(codes)}
+    source_indexes = {source: i for i, source in enumerate(sources)}
+    records = sorted(
+        (code_indexes[fc], code_indexes[tc], rate.rate,
+         rate.updated_at.timestamp(), source_indexes[rate.source])
+        for fc, tc, rate in pairs
+    )
+    chunks = [
+        _HEADER.pack(
+            MAGIC, FORMAT_VERSION, 0, len(codes), len(sources), len(records),
+            storage.last_refresh.timestamp()
+        ),
+        *(
+            _CURRENCY.pack(
+                _encode_name(code, _CURRENCY_SIZE, "Код валюты")
+            )
+            for code in codes
+        ),
+        *(
+            _SOURCE.pack(
+                _encode_name(source, _SOURCE_NAME_SIZE, "Источник"),
+                storage.source_updated_at[source].timestamp()
+            )
+            for source in sources
+        ),
+        *(_RECORD.pack(*record) for record in records)
+    ]
+    return b"".join(chunks)
+
+
+class MappedStorage:
+    """
+    Хранилище курсов валют, отображенное в память из двоичного файла.
+
+    При открытии читаются только заголовок, таблица валют и таблица
+    источников. Прямой и обратный курсы ищутся бинарным поиском по записям
+    без десериализации всего файла. Для остальных операций хранилище
+    однократно загружается полностью (см. storage).
+
+    Отображение освобождается методом close, при выходе из блока with или
+    при удалении хранилища сборщиком мусора.
+
+    :param path: путь к двоичному файлу.
+
+    :raises OSError: если не удалось прочитать файл.
+    :raises BinaryStorageError: если файл имеет неверный формат.
+    """
+    def __init__(self, path: Path):
+        with open(path, "rb") as file:
+            try:
+                self._buffer = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError as e:
+                raise BinaryStorageError(f"Пустой файл \"{path}\": {e}")
+        try:
+            self._read_tables(path)
+        except BinaryStorageError:
+            self._buffer.close()
+            raise
+        self._storage: Storage | None = None
+
+    def _read_tables(self, path: Path) -> None:
+        """
+        Чтение заголовка, таблицы валют и таблицы источников.
+
+        :param path: путь к двоичному файлу (для сообщений об ошибках).
+        :return: None.
+
+        :raises BinaryStorageError: если файл имеет неверный формат.
+        """
+        try:
+            (magic, version, _, currencies_count, sources_count,
+             self._records_count, last_refresh) = \
+                _HEADER.unpack_from(self._buffer, 0)
+        except struct.error as e:
+            raise BinaryStorageError(f"Неверный заголовок \"{path}\": {e}")
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise BinaryStorageError(
+                f"Неподдерживаемый формат файла \"{path}\""
+            )
+        self._last_refresh = datetime.fromtimestamp(last_refresh)
+        offset = _HEADER.size
+        self._codes: list[str] = [
+            item[0].rstrip(b"\0").decode()
+            for item in _CURRENCY.iter_unpack(
+                self._buffer[offset:offset + currencies_count * _CURRENCY.size]
+            )
+        ]
+        self._indexes = {code: i for i, code in enumerate(self._codes)}
+        offset += currencies_count * _CURRENCY.size
+        self._sources: list[str] = []
+        self._source_updated_at: dict[str, datetime] = {}
+        for name, updated_at in _SOURCE.iter_unpack(
+                self._buffer[offset:offset + sources_count * _SOURCE.size]
+        ):
+            source = name.rstrip(b"\0").decode()
+            self._sources.append(source)
+            self._source_updated_at[source] = \
+                datetime.fromtimestamp(updated_at)
+        self._records_offset = offset + sources_count * _SOURCE.size
+        expected_size = \
+            self._records_offset + self._records_count * _RECORD.size
+        if len(self._buffer) < expected_size:
+            raise BinaryStorageError(f"Файл \"{path}\" поврежден")
+
+    def __enter__(self) -> "MappedStorage":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Освобождение отображения файла в память.
+
+        Полностью загруженное хранилище (см. storage) остается доступным
+        через ссылки на него.
+
+        :return: None.
+        """
+        self._buffer.close()
+
+    @property
+    def last_refresh(self) -> datetime:
+        return self._last_refresh
+
+    @property
+    def source_updated_at(self) -> Mapping[str, datetime]:
+        """
+        :return: время обновления самого старого курса каждого источника
+            (см. Storage.source_updated_at).
+        """
+        return MappingProxyType(self._source_updated_at)
+
+    def _find(self, from_index: int, to_index: int) -> float | None:
+        """
+        Бинарный поиск курса.
+
+        :param from_index: индекс конвертируемой валюты.
+        :param to_index: индекс целевой валюты.
+        :return: курс, если запись найдена, иначе None.
+        """
+        record = self._find_record(from_index, to_index)
+        return record[2] if record else None
+
+    def _find_record(
+            self,
+            from_index: int,
+            to_index: int
+    ) -> tuple | None:
+        """
+        Бинарный поиск записи о курсе.
+
+        :param from_index: индекс конвертируемой валюты.
+        :param to_index: индекс целевой валюты.
+        :return: запись (см. _RECORD), если найдена, иначе None.
+        """
+        key = (from_index, to_index)
+        low, high = 0, self._records_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._records_offset + middle * _RECORD.size
+            if _RECORD_KEY.unpack_from(self._buffer, offset) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._records_count:
+            return None
+        offset = self._records_offset + low * _RECORD.size
+        record = _RECORD.unpack_from(self._buffer, offset)
+        return record if record[:2] == key else None
+
+    def get_rate(
+            self,
+            from_currency: str,
+            to_currency: str,
+            timestamp: datetime | None = None
+    ) -> float:
+        """
+        Получение курса валюты.
+
+        Если в файле нет ни прямого, ни обратного курса, то кросс-курс
+        вычисляется по полностью загруженному хранилищу.
+
+        :param from_currency: код конвертируемой валюты.
+        :param to_currency: код валюты, в которую конвертируется.
+        :param timestamp: момент времени (см. Storage.get_rate). Файл
+            содержит только текущие курсы, поэтому история пары состоит из
+            одного курса.
+
+        :return: курс валюты.
+
+        :raises valutatrade_hub.parser_service.exception.UnknownRateError:
+            если курс не найден.
+        """
+        if timestamp is not None:
+            return self.storage().get_rate(
+                from_currency, to_currency, timestamp
+            )
+        if from_currency == to_currency:
+            return 1
+        from_index = self._indexes.get(from_currency)
+        to_index = self._indexes.get(to_currency)
+        if from_index is None or to_index is None:
+            raise UnknownRateError(from_currency, to_currency)
+        rate = self._find(from_index, to_index)
+        if rate:
+            return rate
+        rate = self._find(to_index, from_index)
+        if rate:
+            return 1 / rate
+        return self.storage().get_rate(from_currency, to_currency)
+
+    def find_rate(self, from_currency: str, to_currency: str) -> Rate | None:
+        """
+        Поиск записи о прямом или обратном курсе валюты (см.
+        Storage.find_rate).
+        """
+        from_index = self._indexes.get(from_currency)
+        to_index = self._indexes.get(to_currency)
+        if from_index is None or to_index is None:
+            return None
+        record = self._find_record(from_index, to_index) or \
+            self._find_record(to_index, from_index)
+        if record is None:
+            return None
+        return Rate(
+            record[2],
+            datetime.fromtimestamp(record[3]),
+            self._sources[record[4]]
+        )
+
+    def storage(self) -> Storage:
+        """
+        Полная загрузка хранилища.
+
+        :return: хранилище курсов валют.
+        """
+        if self._storage is None:
+            end = self._records_offset + self._records_count * _RECORD.size
+            pairs: RatesType = {}
+            for (from_index, to_index, rate, updated_at, source_index) in \
+                    _RECORD.iter_unpack(
+                        self._buffer[self._records_offset:end]
+                    ):
+                key = rate_key(self._codes[from_index], self._codes[to_index])
+                pairs[key] = Rate(
+                    rate,
+                    datetime.fromtimestamp(updated_at),
+                    self._sources[source_index]
+                )
+            self._storage = Storage(
+                pairs=pairs,
+                last_refresh=self._last_refresh
+            )
+        return self._storage
+
+    def get_exchange_rate(self, currency: str) -> RateDictType:
+        return self.storage().get_exchange_rate(currency)
+
+    def rate_vector(self, currency: str) -> RateVector | None:
+        return self.storage().rate_vector(currency)
+
+    def top(self, count: int) -> RateDictType:
+        return self.storage().top(count)
+
+    def as_of(self, timestamp: datetime) -> Storage:
+        return self.storage().as_of(timestamp)
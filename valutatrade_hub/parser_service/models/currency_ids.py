@@ -0,0 +1,50 @@
+from threading import Lock
+
+#: {код валюты: идентификатор}
+_IDS: dict[str, int] = {}
+#: коды валют по идентификаторам
+_CODES: list[str] = []
+_LOCK = Lock()
+
+
+def currency_id(code: str) -> int:
+    """
+    Получение идентификатора валюты.
+
+    Идентификаторы - небольшие целые числа, выдаваемые по порядку при первом
+    обращении к коду валюты. Они действительны в пределах одного процесса и
+    не сохраняются в файлы.
+
+    :param code: код валюты.
+    :return: идентификатор валюты.
+    """
+    try:
+        return _IDS[code]
+    except KeyError:
+        with _LOCK:
+            if code not in _IDS:
+                _IDS[code] = len(_CODES)
+                _CODES.append(code)
+            return _IDS[code]
+
+
+def find_currency_id(code: str) -> int | None:
+    """
+    Поиск идентификатора валюты без его выдачи.
+
+    :param code: код валюты.
+    :return: идентификатор валюты, если он был выдан, иначе None.
+    """
+    return _IDS.get(code)
+
+
+def currency_code(cid: int) -> str:
+    """
+    Получение кода валюты по идентификатору.
+
+    :param cid: идентификатор валюты.
+    :return: код валюты.
+
+    :raises IndexError: если идентификатор не был выдан.
+    """
+    return _CODES[cid]
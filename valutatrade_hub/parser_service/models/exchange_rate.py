@@ -1,15 +1,17 @@
-from dataclasses import dataclass, field
+import sys
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from enum import Enum
 from http import HTTPStatus
 
 
-@dataclass
+@dataclass(slots=True)
 class ExchangeRateMeta:
     raw_id: str
     request_ms: int
     status_code: HTTPStatus
-    etag: str = field(default="W/\"abc123\"")
+    #: ETag ответа API, если API его вернул
+    etag: str | None = None
 
 
 class SimpleExchangeRateJsonKeys(Enum):
@@ -25,24 +27,34 @@ class ExchangeRateJsonKeys(Enum):
     meta = "meta"
 
 
-@dataclass
+@dataclass(slots=True)
 class ExchangeRate:
     """
     Запись о курсе валюты для журнала измерений
+
+    Коды валют и источник интернируются: записи журнала разделяют одни и те
+    же строки. Идентификатор и время в формате ISO вычисляются при
+    обращении, а не хранятся в каждой записи.
     """
-    id: str = field(init=False)
     from_currency: str
     to_currency: str
     rate: float
     timestamp: datetime
-    timestamp_iso: str = field(init=False)
     source: str
     meta: ExchangeRateMeta
 
     def __post_init__(self):
-        self.timestamp_iso = self.timestamp.isoformat()
-        self.id = \
-            f"{self.from_currency}_{self.to_currency}_{self.timestamp_iso}"
+        self.from_currency = sys.intern(self.from_currency)
+        self.to_currency = sys.intern(self.to_currency)
+        self.source = sys.intern(self.source)
+
+    @property
+    def timestamp_iso(self) -> str:
+        return self.timestamp.isoformat()
+
+    @property
+    def id(self) -> str:
+        return f"{self.from_currency}_{self.to_currency}_{self.timestamp_iso}"
 
     @classmethod
     def load(cls, data: dict) -> "ExchangeRate":
@@ -75,7 +87,7 @@ class ExchangeRate:
             for penum in SimpleExchangeRateJsonKeys
         } | {
             ExchangeRateJsonKeys.timestamp.value: self.timestamp.isoformat(),
-            ExchangeRateJsonKeys.meta.value: self.meta.__dict__
+            ExchangeRateJsonKeys.meta.value: asdict(self.meta)
         }
 
 
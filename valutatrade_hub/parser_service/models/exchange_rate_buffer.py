@@ -0,0 +1,114 @@
+from collections.abc import Iterator, Sequence
+
+from .exchange_rate import ExchangeRate
+
+
+class ExchangeRateBuffer:
+    """
+    Кольцевой буфер журнальных записей фиксированной емкости.
+
+    Список записей выделяется один раз; новые записи замещают самые старые
+    на месте, поэтому добавление не копирует буфер, а память не растет
+    после заполнения. Читателям выдаются представления (см. view) без
+    копирования записей.
+
+    :param capacity: максимальное количество записей.
+    """
+    __slots__ = ("_records", "_capacity", "_count")
+
+    def __init__(self, capacity: int):
+        if capacity < 0:
+            raise ValueError("Емкость буфера не может быть отрицательной")
+        self._capacity = capacity
+        self._records: list[ExchangeRate | None] = [None] * capacity
+        #: количество записей, добавленных за все время
+        self._count = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+
+    def extend(self, records: Sequence[ExchangeRate]) -> None:
+        """
+        Добавление записей.
+
+        :param records: записи в порядке добавления.
+        :return: None.
+        """
+        capacity = self._capacity
+        if not capacity:
+            return
+        if len(records) > capacity:
+            # записи, которые сразу были бы замещены, не записываются
+            self._count += len(records) - capacity
+            records = records[-capacity:]
+        for record in records:
+            # счетчик увеличивается до записи: если читатель прочитал ячейку
+            # после перезаписи, то повторная проверка счетчика это покажет
+            # (см. _get)
+            position = self._count
+            self._count += 1
+            self._records[position % capacity] = record
+
+    def view(self) -> "ExchangeRateBufferView":
+        """
+        :return: представление записей, находящихся в буфере.
+        """
+        return ExchangeRateBufferView(
+            self, self._count - len(self), self._count
+        )
+
+    def _get(self, position: int) -> ExchangeRate | None:
+        """
+        Получение записи по ее номеру за все время.
+
+        Счетчик проверяется после чтения ячейки: запись, которую замещают
+        во время чтения, не подменяется более новой.
+
+        :param position: номер записи.
+        :return: запись или None, если она уже замещена.
+        """
+        if position >= self._count:
+            return None
+        record = self._records[position % self._capacity]
+        if position < self._count - self._capacity:
+            return None
+        return record
+
+
+class ExchangeRateBufferView(Sequence[ExchangeRate]):
+    """
+    Представление записей кольцевого буфера, от самой старой к самой новой.
+
+    Записи не копируются. Записи, замещенные в буфере после создания
+    представления, пропускаются при итерации.
+
+    :param buffer: буфер.
+    :param start: номер первой записи за все время.
+    :param stop: номер записи, следующей за последней.
+    """
+    __slots__ = ("_buffer", "_start", "_stop")
+
+    def __init__(self, buffer: ExchangeRateBuffer, start: int, stop: int):
+        self._buffer = buffer
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: int) -> ExchangeRate:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс записи вне диапазона")
+        record = self._buffer._get(self._start + index)
+        if record is None:
+            raise IndexError("Запись замещена в буфере")
+        return record
+
+    def __iter__(self) -> Iterator[ExchangeRate]:
+        for position in range(self._start, self._stop):
+            record = self._buffer._get(position)
+            if record is not None:
+                yield record
+
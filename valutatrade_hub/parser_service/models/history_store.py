@@ -0,0 +1,588 @@
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import NamedTuple
+
+from .exchange_rate import ExchangeRate
+from .rate import Rate, load_rate_key
+from .rate_history import RateHistory, RatesHistoryType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class _Column(NamedTuple):
+    """
+    Описание колонки сегмента.
+    """
+    #: расширение файла колонки
+    suffix: str
+    #: код типа для array
+    typecode: str
+    #: тип NumPy
+    dtype: str
+
+
+#: колонки сегмента: время (unix time), id пары, курс, id источника,
+#: время выполнения запроса (мс)
+_TIMESTAMP = _Column(".ts", "d", "<f8")
+_PAIR = _Column(".pair", "I", "<u4")
+_RATE = _Column(".rate", "d", "<f8")
+_SOURCE = _Column(".source", "H", "<u2")
+_REQUEST_MS = _Column(".ms", "I", "<u4")
+_COLUMNS = (_TIMESTAMP, _PAIR, _RATE, _SOURCE, _REQUEST_MS)
+
+
+class HistoryColumns(NamedTuple):
+    """
+    Результат запроса к истории курсов в виде колонок.
+
+    Если установлен NumPy, то колонки - массивы numpy.ndarray (для
+    отображенных в память сегментов - без копирования), иначе - array.array.
+    """
+    timestamps: Sequence[float]
+    pair_ids: Sequence[int]
+    rates: Sequence[float]
+    source_ids: Sequence[int]
+    request_ms: Sequence[int]
+
+
+class HistoryRecord(NamedTuple):
+    """
+    Запись истории курсов.
+    """
+    timestamp: datetime
+    from_currency: str
+    to_currency: str
+    rate: float
+    source: str
+    request_ms: int
+
+
+class HistoryStore:
+    """
+    Хранилище истории курсов валют только для дозаписи.
+
+    История хранится в директории сегментами. Сегмент - набор файлов-колонок
+    фиксированной ширины (время, id пары, курс, id источника, время запроса),
+    которые можно отобразить в память NumPy. Новые записи дописываются в
+    конец последнего сегмента; когда он заполнен, начинается новый.
+    Справочники пар и источников хранятся в pairs.json и sources.json.
+
+    Колонка времени в каждом сегменте отсортирована, поэтому запрос по
+    интервалу времени выполняется бинарным поиском. Записи старше уже
+    дописанных (например, от параллельных обновлений разных источников)
+    сливаются с хвостом последнего сегмента (см. append). Дописывать
+    историю должен один процесс; другие процессы открывают ее только для
+    чтения (read_only).
+
+    :param dir_path: путь к директории хранилища.
+    :param segment_size: максимальное количество записей в сегменте.
+    :param read_only: только чтение истории, которую дописывает другой
+        процесс: директория не создается, колонки не выравниваются, а
+        сегменты и справочники перечитываются при каждом запросе.
+    """
+    def __init__(
+            self,
+            dir_path: Path,
+            segment_size: int,
+            read_only: bool = False
+    ):
+        if segment_size <= 0:
+            raise ValueError("Размер сегмента должен быть больше 0")
+        self._dir_path = dir_path
+        self._segment_size = segment_size
+        self._read_only = read_only
+        self._lock = Lock()
+        if not read_only:
+            self._dir_path.mkdir(parents=True, exist_ok=True)
+        self._load_dictionaries()
+        self._segments = self._scan_segments()
+        self._last_segment_len = 0
+        if self._segments and not read_only:
+            self._last_segment_len = self._repair(self._segments[-1])
+
+    def _load_dictionaries(self) -> None:
+        """
+        Чтение справочников пар и источников.
+
+        :return: None.
+        """
+        self._pairs: list[str] = self._read_dictionary("pairs.json")
+        self._pair_ids = {key: i for i, key in enumerate(self._pairs)}
+        self._sources: list[str] = self._read_dictionary("sources.json")
+        self._source_ids = {key: i for i, key in enumerate(self._sources)}
+
+    def _scan_segments(self) -> list[int]:
+        """
+        :return: номера сегментов в директории по возрастанию.
+        """
+        return sorted(
+            int(path.stem.rsplit("_", 1)[-1])
+            for path in self._dir_path.glob(f"segment_*{_TIMESTAMP.suffix}")
+        )
+
+    def _read_dictionary(self, file_name: str) -> list[str]:
+        """
+        Чтение справочника.
+
+        :param file_name: имя файла справочника.
+        :return: список значений, индекс значения - его id.
+        """
+        path = self._dir_path / file_name
+        if not path.exists():
+            return []
+        with open(path) as file:
+            return json.load(file)
+
+    def _write_dictionary(self, file_name: str, values: list[str]) -> None:
+        """
+        Атомарная запись справочника.
+
+        :param file_name: имя файла справочника.
+        :param values: список значений.
+        :return: None.
+        """
+        path = self._dir_path / file_name
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(values, file)
+        tmp_path.replace(path)
+
+    def _column_path(self, segment: int, column: _Column) -> Path:
+        return self._dir_path / f"segment_{segment:06d}{column.suffix}"
+
+    def _segment_len(self, segment: int) -> int:
+        """
+        :param segment: номер сегмента.
+        :return: количество записей в сегменте.
+        """
+        if self._read_only:
+            # колонки может дописывать другой процесс
+            return self._columns_len(segment)
+        size = self._column_path(segment, _TIMESTAMP).stat().st_size
+        return size // array(_TIMESTAMP.typecode).itemsize
+
+    def _segment_lengths(self) -> list[tuple[int, int]]:
+        """
+        Длины сегментов для запроса.
+
+        При чтении истории другого процесса сегменты перечитываются, а
+        справочники читаются после длин сегментов: другой процесс записывает
+        справочники раньше колонок, поэтому все id прочитанных записей есть
+        в справочниках.
+
+        :return: список вида [(номер сегмента, количество записей)].
+        """
+        with self._lock:
+            if self._read_only:
+                self._segments = self._scan_segments()
+            segments = [
+                (segment, self._segment_len(segment))
+                for segment in self._segments
+            ]
+            if self._read_only:
+                self._load_dictionaries()
+        return segments
+
+    def _columns_len(self, segment: int) -> int:
+        """
+        :param segment: номер сегмента.
+        :return: длина самой короткой колонки сегмента.
+        """
+        lengths = []
+        for column in _COLUMNS:
+            path = self._column_path(segment, column)
+            size = path.stat().st_size if path.exists() else 0
+            lengths.append(size // array(column.typecode).itemsize)
+        return min(lengths)
+
+    def _repair(self, segment: int) -> int:
+        """
+        Выравнивание колонок сегмента после прерванной дозаписи.
+
+        Колонки обрезаются до длины самой короткой из них.
+
+        :param segment: номер сегмента.
+        :return: количество записей в сегменте.
+        """
+        length = self._columns_len(segment)
+        for column in _COLUMNS:
+            path = self._column_path(segment, column)
+            with open(path, "ab") as file:
+                file.truncate(length * array(column.typecode).itemsize)
+        return length
+
+    def _merge_tail(self, columns: list[array]) -> list[array]:
+        """
+        Слияние новых записей с более новыми записями последнего сегмента.
+
+        Записи последнего сегмента, более новые, чем самая старая из новых
+        записей, переписываются на месте вместе с новыми в порядке времени
+        (файлы не укорачиваются, поэтому отображенные читателями колонки
+        остаются доступными). Записи старше начала последнего сегмента
+        попадают в его начало, и интервалы времени сегментов пересекаются
+        (см. query).
+
+        :param columns: колонки новых записей, отсортированные по времени.
+        :return: колонки записей для дозаписи с позиции _last_segment_len.
+        """
+        length = self._last_segment_len
+        if not self._segments or not length:
+            return columns
+        segment = self._segments[-1]
+        timestamps = self._read_column(segment, _TIMESTAMP, length)
+        position = self._bounds(timestamps, columns[0][0], float("inf"))[0]
+        if position == length:
+            return columns
+        tail = [
+            list(self._read_column(segment, column, length)[position:])
+            for column in _COLUMNS
+        ]
+        rows = sorted(
+            [*zip(*tail), *zip(*columns)], key=lambda row: row[0]
+        )
+        self._last_segment_len = position
+        return [
+            array(column.typecode, (row[i] for row in rows))
+            for i, column in enumerate(_COLUMNS)
+        ]
+
+    def _intern(
+            self,
+            value: str,
+            ids: dict[str, int],
+            values: list[str]
+    ) -> tuple[int, bool]:
+        """
+        Получение id значения справочника.
+
+        :return: id значения и признак того, что значение новое.
+        """
+        if value in ids:
+            return ids[value], False
+        ids[value] = len(values)
+        values.append(value)
+        return ids[value], True
+
+    def append(self, records: list[ExchangeRate]) -> None:
+        """
+        Дозапись журнальных записей в историю.
+
+        Записи сортируются по времени; записи старше уже дописанных
+        сливаются с хвостом последнего сегмента (см. _merge_tail).
+
+        :param records: журнальные записи.
+        :return: None.
+
+        :raises OSError: если не удалось записать файлы.
+        :raises RuntimeError: если история открыта только для чтения.
+        """
+        if self._read_only:
+            raise RuntimeError("История курсов открыта только для чтения")
+        if not records:
+            return
+        records = sorted(records, key=lambda item: item.timestamp)
+        with self._lock:
+            columns = [array(column.typecode) for column in _COLUMNS]
+            new_pairs = new_sources = False
+            for record in records:
+                pair_id, is_new_pair = self._intern(
+                    f"{record.from_currency}_{record.to_currency}",
+                    self._pair_ids,
+                    self._pairs
+                )
+                source_id, is_new_source = self._intern(
+                    record.source, self._source_ids, self._sources
+                )
+                new_pairs |= is_new_pair
+                new_sources |= is_new_source
+                for column, value in zip(columns, (
+                        record.timestamp.timestamp(), pair_id, record.rate,
+                        source_id, record.meta.request_ms
+                )):
+                    column.append(value)
+            if new_pairs:
+                self._write_dictionary("pairs.json", self._pairs)
+            if new_sources:
+                self._write_dictionary("sources.json", self._sources)
+            self._write_columns(self._merge_tail(columns))
+
+    def _write_columns(self, columns: list[array]) -> None:
+        """
+        Дозапись колонок в сегменты с переходом на новый сегмент.
+
+        :param columns: колонки новых записей.
+        :return: None.
+        """
+        start = 0
+        total = len(columns[0])
+        while start < total:
+            if not self._segments or \
+                    self._last_segment_len >= self._segment_size:
+                self._segments.append(
+                    self._segments[-1] + 1 if self._segments else 0
+                )
+                self._last_segment_len = 0
+            count = min(
+                total - start, self._segment_size - self._last_segment_len
+            )
+            for column, values in zip(_COLUMNS, columns):
+                path = self._column_path(self._segments[-1], column)
+                offset = \
+                    self._last_segment_len * array(column.typecode).itemsize
+                # запись с позиции _last_segment_len (см. _merge_tail)
+                with open(path, "r+b" if path.exists() else "wb") as file:
+                    file.seek(offset)
+                    values[start:start + count].tofile(file)
+            self._last_segment_len += count
+            start += count
+
+    def _read_column(self, segment: int, column: _Column, length: int):
+        """
+        Чтение колонки сегмента.
+
+        :return: numpy.memmap, если установлен NumPy, иначе array.array.
+        """
+        path = self._column_path(segment, column)
+        if np is not None:
+            if length == 0:
+                return np.empty(0, dtype=column.dtype)
+            return np.memmap(
+                path, dtype=column.dtype, mode="r", shape=(length,)
+            )
+        values = array(column.typecode)
+        with open(path, "rb") as file:
+            values.fromfile(file, length)
+        return values
+
+    def query(
+            self,
+            start: datetime | None = None,
+            end: datetime | None = None,
+            from_currency: str | None = None,
+            to_currency: str | None = None
+    ) -> HistoryColumns:
+        """
+        Запрос истории по интервалу времени и паре валют.
+
+        :param start: начало интервала (включительно).
+        :param end: конец интервала (включительно).
+        :param from_currency: код конвертируемой валюты.
+        :param to_currency: код валюты, в которую конвертируется. Пара
+            учитывается, только если указаны обе валюты.
+
+        :return: колонки найденных записей в порядке времени.
+        """
+        segments = self._segment_lengths()
+        pair_id: int | None = None
+        if from_currency and to_currency:
+            pair_id = self._pair_ids.get(f"{from_currency}_{to_currency}")
+            if pair_id is None:
+                return self._empty_columns()
+        start_ts = start.timestamp() if start else float("-inf")
+        end_ts = end.timestamp() if end else float("inf")
+        parts: list[list] = [[] for _ in _COLUMNS]
+        ordered = True
+        last_ts = float("-inf")
+        for segment, length in segments:
+            timestamps = self._read_column(segment, _TIMESTAMP, length)
+            if not length or timestamps[0] > end_ts or \
+                    timestamps[-1] < start_ts:
+                continue
+            ordered &= bool(timestamps[0] >= last_ts)
+            last_ts = timestamps[-1]
+            low, high = self._bounds(timestamps, start_ts, end_ts)
+            columns = [timestamps[low:high]] + [
+                self._read_column(segment, column, length)[low:high]
+                for column in _COLUMNS[1:]
+            ]
+            if pair_id is not None:
+                columns = self._filter_pair(columns, pair_id)
+            for part, column in zip(parts, columns):
+                part.append(column)
+        columns = self._concat(parts)
+        return columns if ordered else self._sort(columns)
+
+    @staticmethod
+    def _sort(columns: HistoryColumns) -> HistoryColumns:
+        """
+        Сортировка записей по времени (если интервалы времени сегментов
+        пересекаются, см. _merge_tail).
+
+        :param columns: колонки записей.
+        :return: колонки записей в порядке времени.
+        """
+        if np is not None:
+            order = np.argsort(columns.timestamps, kind="stable")
+            return HistoryColumns(*(column[order] for column in columns))
+        order = sorted(
+            range(len(columns.timestamps)),
+            key=columns.timestamps.__getitem__
+        )
+        return HistoryColumns(*(
+            array(column.typecode, (values[i] for i in order))
+            for column, values in zip(_COLUMNS, columns)
+        ))
+
+    @staticmethod
+    def _bounds(
+            timestamps: Sequence[float],
+            start_ts: float,
+            end_ts: float
+    ) -> tuple[int, int]:
+        """
+        Бинарный поиск границ интервала в отсортированной колонке времени.
+
+        :return: индексы первой записи интервала и записи после последней.
+        """
+        if np is not None:
+            return (
+                int(np.searchsorted(timestamps, start_ts, side="left")),
+                int(np.searchsorted(timestamps, end_ts, side="right"))
+            )
+        return (
+            bisect_left(timestamps, start_ts),
+            bisect_right(timestamps, end_ts)
+        )
+
+    @staticmethod
+    def _filter_pair(columns: list, pair_id: int) -> list:
+        """
+        Отбор записей одной пары.
+
+        :param columns: колонки записей.
+        :param pair_id: id пары.
+        :return: колонки записей пары.
+        """
+        if np is not None:
+            mask = columns[1] == pair_id
+            return [column[mask] for column in columns]
+        indexes = [i for i, value in enumerate(columns[1]) if value == pair_id]
+        return [
+            array(column.typecode, (values[i] for i in indexes))
+            for column, values in zip(_COLUMNS, columns)
+        ]
+
+    @staticmethod
+    def _concat(parts: list[list]) -> HistoryColumns:
+        """
+        Объединение колонок нескольких сегментов.
+
+        Если запрос затронул один сегмент, то колонки возвращаются без
+        копирования.
+        """
+        columns = []
+        for column, part in zip(_COLUMNS, parts):
+            if len(part) == 1:
+                columns.append(part[0])
+            elif np is not None:
+                columns.append(
+                    np.concatenate(part) if part
+                    else np.empty(0, dtype=column.dtype)
+                )
+            else:
+                values = array(column.typecode)
+                for item in part:
+                    values.extend(item)
+                columns.append(values)
+        return HistoryColumns(*columns)
+
+    def _empty_columns(self) -> HistoryColumns:
+        return self._concat([[] for _ in _COLUMNS])
+
+    def records(self, columns: HistoryColumns) -> Iterator[HistoryRecord]:
+        """
+        Преобразование колонок в записи.
+
+        :param columns: колонки, полученные из query.
+        :return: итератор записей.
+        """
+        for timestamp, pair_id, rate, source_id, request_ms in zip(*columns):
+            from_currency, _, to_currency = \
+                self._pairs[int(pair_id)].partition("_")
+            yield HistoryRecord(
+                timestamp=datetime.fromtimestamp(float(timestamp)),
+                from_currency=from_currency,
+                to_currency=to_currency,
+                rate=float(rate),
+                source=self._sources[int(source_id)],
+                request_ms=int(request_ms)
+            )
+
+    def rate_histories(self, max_len: int | None = None) -> RatesHistoryType:
+        """
+        Загрузка истории курсов по парам.
+
+        Сегменты читаются от нового к старому; чтение прекращается, когда
+        для каждой пары справочника набрано max_len курсов, поэтому время
+        загрузки зависит от max_len, а не от размера всей истории.
+
+        :param max_len: максимальное количество последних курсов пары.
+        :return: истории курсов вида
+            {(from_currency_id, to_currency_id): RateHistory}.
+        """
+        segments = self._segment_lengths()
+        pairs_count = len(self._pairs)
+        rates: dict[int, list[Rate]] = {}
+        full = 0
+        for segment, length in reversed(segments):
+            columns = HistoryColumns(*(
+                self._read_column(segment, column, length)
+                for column in _COLUMNS
+            ))
+            for pair_id, indexes in \
+                    self._pair_indexes(columns.pair_ids).items():
+                pair_rates = rates.setdefault(pair_id, [])
+                if max_len:
+                    if len(pair_rates) >= max_len:
+                        continue
+                    indexes = indexes[len(pair_rates) - max_len:]
+                pair_rates.extend(
+                    Rate(
+                        float(columns.rates[i]),
+                        datetime.fromtimestamp(float(columns.timestamps[i])),
+                        self._sources[int(columns.source_ids[i])]
+                    )
+                    for i in indexes
+                )
+                if max_len and len(pair_rates) >= max_len:
+                    full += 1
+            if max_len and full >= pairs_count:
+                break
+        return {
+            load_rate_key(self._pairs[pair_id]): RateHistory(pair_rates)
+            for pair_id, pair_rates in rates.items()
+        }
+
+    @staticmethod
+    def _pair_indexes(pair_ids: Sequence[int]) -> dict[int, Sequence[int]]:
+        """
+        Группировка индексов записей по парам.
+
+        С NumPy записи группируются одной устойчивой сортировкой по id пары.
+
+        :param pair_ids: колонка id пар.
+        :return: словарь вида {id пары: индексы записей по возрастанию}.
+        """
+        if np is not None:
+            order = np.argsort(pair_ids, kind="stable")
+            sorted_ids = np.asarray(pair_ids)[order]
+            starts = np.flatnonzero(np.diff(sorted_ids)) + 1
+            return {
+                int(sorted_ids[start]): group
+                for start, group in zip(
+                    np.concatenate(([0], starts)), np.split(order, starts)
+                )
+                if len(group)
+            }
+        indexes: dict[int, list[int]] = {}
+        for i, pair_id in enumerate(pair_ids):
+            indexes.setdefault(pair_id, []).append(i)
+        return indexes
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 
+from .currency_ids import currency_code, currency_id
+
 
 class RateJsonKey(Enum):
     rate = "rate"
@@ -18,6 +20,24 @@ class Rate:
     updated_at: datetime
     source: str
 
+    @classmethod
+    def load(cls, data: dict) -> "Rate":
+        """
+        Создание нового экземпляра класса из словаря.
+
+        :param data: параметры экземпляра класса.
+        :return: новый экземпляр класса.
+
+        :raises KeyError: если ключ не найден.
+        """
+        return cls(
+            rate=data[RateJsonKey.rate.value],
+            updated_at=datetime.fromisoformat(
+                data[RateJsonKey.updated_at.value]
+            ),
+            source=data[RateJsonKey.source.value]
+        )
+
     def dump(self) -> dict:
         return {
             RateJsonKey.rate.value: self.rate,
@@ -26,10 +46,12 @@ class Rate:
         }
 
 
-RatesType = dict[str, Rate]  # {from_currency_to_currency: Rate}
+#: ключ курса: (id конвертируемой валюты, id целевой валюты)
+PairKey = tuple[int, int]
+RatesType = dict[PairKey, Rate]  # {(from_currency_id, to_currency_id): Rate}
 
 
-def rate_key(from_currency: str, to_currency: str) -> str:
+def rate_key(from_currency: str, to_currency: str) -> PairKey:
     """
     Формирование ключа для хранения курса валюты.
 
@@ -37,15 +59,41 @@ def rate_key(from_currency: str, to_currency: str) -> str:
     :param to_currency: валюта, в которую производится конвертация.
     :return: ключ для хранения курса валюты.
     """
-    return f"{from_currency}_{to_currency}"
+    return currency_id(from_currency), currency_id(to_currency)
 
 
-def parse_rate_key(key: str) -> tuple[str, str]:
+def parse_rate_key(key: PairKey) -> tuple[str, str]:
     """
     Парсинг ключа для хранения курса валюты.
 
     :param key: ключ.
     :return: конвертируемая и валюта, в которую производится конвертация.
     """
-    fc, tc = key.split("_")
-    return fc, tc
+    return currency_code(key[0]), currency_code(key[1])
+
+
+def format_rate_key(key: PairKey) -> str:
+    """
+    Формирование строкового ключа курса для JSON и вывода.
+
+    :param key: ключ.
+    :return: ключ вида "FROM_TO".
+    """
+    return "_".join(parse_rate_key(key))
+
+
+def load_rate_key(key: str) -> PairKey:
+    """
+    Парсинг строкового ключа курса вида "FROM_TO".
+
+    Ключ делится по первому символу подчеркивания.
+
+    :param key: строковый ключ.
+    :return: ключ.
+
+    :raises ValueError: если ключ не содержит символ подчеркивания.
+    """
+    from_currency, sep, to_currency = key.partition("_")
+    if not sep:
+        raise ValueError(f"Некорректный ключ курса \"{key}\"")
+    return rate_key(from_currency, to_currency)
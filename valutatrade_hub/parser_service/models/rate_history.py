@@ -0,0 +1,102 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from datetime import datetime
+
+from .rate import PairKey, Rate
+
+
+class RateHistory:
+    """
+    История курса одной пары валют, отсортированная по времени обновления.
+
+    Версии истории разделяют общие списки, которые только дополняются в
+    конец: каждая версия видит свой префикс списков. Поэтому добавление
+    более свежего курса не копирует историю и не изменяет версии, уже
+    используемые читателями (см. add).
+
+    :param rates: курсы пары в любом порядке.
+    """
+    __slots__ = ("_timestamps", "_rates", "_length")
+
+    def __init__(self, rates: Iterable[Rate] = ()):
+        self._rates: list[Rate] = sorted(
+            rates, key=lambda rate: rate.updated_at
+        )
+        self._timestamps: list[datetime] = [
+            rate.updated_at for rate in self._rates
+        ]
+        self._length = len(self._rates)
+
+    @classmethod
+    def _view(
+            cls,
+            timestamps: list[datetime],
+            rates: list[Rate],
+            length: int
+    ) -> "RateHistory":
+        history = cls.__new__(cls)
+        history._timestamps = timestamps
+        history._rates = rates
+        history._length = length
+        return history
+
+    def __len__(self) -> int:
+        return self._length
+
+    def as_of(self, timestamp: datetime) -> Rate | None:
+        """
+        Получение курса, действовавшего в указанный момент.
+
+        :param timestamp: момент времени.
+        :return: последний курс, обновленный не позже timestamp, или None,
+            если таких курсов нет.
+        """
+        index = bisect_right(self._timestamps, timestamp, 0, self._length)
+        return self._rates[index - 1] if index else None
+
+    def add(self, rate: Rate, max_len: int | None = None) -> "RateHistory":
+        """
+        Создание новой версии истории с добавленным курсом.
+
+        Курс, более свежий, чем все курсы истории, дописывается в общие
+        списки; иначе списки версии копируются. Курс с уже известным
+        временем обновления заменяет прежний.
+
+        :param rate: курс.
+        :param max_len: ограничение длины истории: когда она превышает
+            2 * max_len, остаются только max_len последних курсов.
+
+        :return: новая версия истории (или текущая, если курс уже есть).
+        """
+        length = self._length
+        if length and rate.updated_at <= self._timestamps[length - 1]:
+            index = bisect_left(self._timestamps, rate.updated_at, 0, length)
+            known = self._timestamps[index] == rate.updated_at
+            if known and self._rates[index] == rate:
+                # курс уже есть: история не копируется
+                return self
+            rates = self._rates[:length]
+            if known:
+                rates[index] = rate
+            else:
+                rates.insert(index, rate)
+            timestamps = [item.updated_at for item in rates]
+        elif length != len(self._rates):
+            # общие списки уже дополнены другой версией
+            rates = self._rates[:length] + [rate]
+            timestamps = self._timestamps[:length] + [rate.updated_at]
+        else:
+            self._rates.append(rate)
+            self._timestamps.append(rate.updated_at)
+            rates, timestamps = self._rates, self._timestamps
+        length = len(rates) if rates is not self._rates else length + 1
+        if max_len and length > 2 * max_len:
+            # копирование амортизировано: выполняется раз в max_len курсов
+            rates = rates[length - max_len:length]
+            timestamps = timestamps[length - max_len:length]
+            length = max_len
+        return self._view(timestamps, rates, length)
+
+
+#: истории курсов вида {(from_currency_id, to_currency_id): RateHistory}
+RatesHistoryType = dict[PairKey, RateHistory]
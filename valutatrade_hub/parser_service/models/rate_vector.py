@@ -0,0 +1,92 @@
+from ..exception import UnknownRateError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def numpy_available() -> bool:
+    """
+    :return: True, если установлен NumPy.
+    """
+    return np is not None
+
+
+class RateVector:
+    """
+    Плотное представление курсов относительно базовой валюты.
+
+    Хранит вектор float64, в котором i-й элемент равен стоимости одной единицы
+    i-й валюты в базовой валюте, и словарь {код валюты: индекс}. Стоимость
+    портфеля вычисляется как скалярное произведение вектора балансов на этот
+    вектор. Требует NumPy.
+
+    :param base_currency: код базовой валюты.
+    :param rates: курсы относительно базовой валюты вида {код валюты: курс}
+        (см. Storage.get_exchange_rate).
+    """
+    def __init__(self, base_currency: str, rates: dict[str, float]):
+        if np is None:
+            raise RuntimeError("Для RateVector требуется NumPy")
+        self._base_currency = base_currency
+        codes = [base_currency, *(
+            code for code in rates if code != base_currency
+        )]
+        self._indexes: dict[str, int] = {
+            code: i for i, code in enumerate(codes)
+        }
+        rates_array = np.fromiter(
+            (rates[code] for code in codes[1:]),
+            dtype=np.float64,
+            count=len(codes) - 1
+        )
+        #: валюты с нулевым курсом, стоимость которых не определена
+        self._zero_rates = frozenset(
+            code for code in codes[1:] if rates[code] == 0
+        )
+        self._values = np.empty(len(codes), dtype=np.float64)
+        self._values[0] = 1.0
+        with np.errstate(divide="ignore"):
+            self._values[1:] = 1.0 / rates_array
+
+    @property
+    def base_currency(self) -> str:
+        return self._base_currency
+
+    @property
+    def indexes(self) -> dict[str, int]:
+        """
+        :return: словарь вида {код валюты: индекс в векторе}.
+        """
+        return self._indexes
+
+    def value(self, balances: dict[str, float]) -> float:
+        """
+        Стоимость набора балансов в базовой валюте.
+
+        Балансы и индексы валют собираются в массивы без поэлементной записи,
+        после чего стоимость вычисляется одним скалярным произведением.
+
+        :param balances: балансы вида {код валюты: баланс}.
+        :return: стоимость в базовой валюте.
+
+        :raises UnknownRateError: если для валюты нет курса.
+        :raises ZeroDivisionError: если курс валюты равен нулю.
+        """
+        count = len(balances)
+        try:
+            indexes = np.fromiter(
+                (self._indexes[code] for code in balances),
+                dtype=np.intp,
+                count=count
+            )
+        except KeyError as e:
+            raise UnknownRateError(e.args[0], self._base_currency)
+        if not self._zero_rates.isdisjoint(balances):
+            # как и при конвертации по словарю курсов (см. Wallet.convert)
+            raise ZeroDivisionError("Курс валюты равен нулю")
+        amounts = np.fromiter(
+            balances.values(), dtype=np.float64, count=count
+        )
+        return float(amounts @ self._values[indexes])
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from .rate import Rate, RatesType
+
+#: состояние обхода графа котировок: (курс от исходной валюты, время
+#: обновления самого старого курса на пути)
+_PathState = tuple[float, datetime]
+
+
+class RatesIndex:
+    """
+    Индекс курсов валют по идентификаторам валют.
+
+    Для каждой валюты хранит прямых соседей (курсы, в которых валюта является
+    конвертируемой) и обратных соседей (курсы, в которых валюта является
+    целевой). Поиск курсов для одной валюты выполняется за O(число соседей),
+    а не полным перебором всех пар.
+
+    :param pairs: словарь курсов валют вида
+        {(from_currency_id, to_currency_id): Rate}.
+    """
+    def __init__(self, pairs: RatesType):
+        self._outgoing: dict[int, dict[int, Rate]] = {}
+        self._inverse: dict[int, dict[int, Rate]] = {}
+        for (from_id, to_id), rate in pairs.items():
+            self.add(from_id, to_id, rate)
+
+    def add(self, from_id: int, to_id: int, rate: Rate) -> None:
+        """
+        Добавление (замена) курса в индексе.
+
+        :param from_id: идентификатор конвертируемой валюты.
+        :param to_id: идентификатор валюты, в которую конвертируется.
+        :param rate: курс валюты.
+        :return: None.
+        """
+        self._outgoing.setdefault(from_id, {})[to_id] = rate
+        self._inverse.setdefault(to_id, {})[from_id] = rate
+
+    def outgoing(self, cid: int) -> dict[int, Rate]:
+        """
+        :param cid: идентификатор валюты.
+        :return: курсы, в которых валюта является конвертируемой, вида
+            {идентификатор целевой валюты: Rate}.
+        """
+        return self._outgoing.get(cid, {})
+
+    def inverse(self, cid: int) -> dict[int, Rate]:
+        """
+        :param cid: идентификатор валюты.
+        :return: курсы, в которых валюта является целевой, вида
+            {идентификатор конвертируемой валюты: Rate}.
+        """
+        return self._inverse.get(cid, {})
+
+    def _edges(self, cid: int) -> list[tuple[int, float, datetime]]:
+        """
+        Ребра графа котировок, выходящие из валюты.
+
+        :param cid: идентификатор валюты.
+        :return: список вида
+            [(идентификатор соседней валюты, курс, время обновления)].
+        """
+        edges = [
+            (to_id, rate.rate, rate.updated_at)
+            for to_id, rate in self.outgoing(cid).items()
+        ]
+        edges.extend(
+            (from_id, 1 / rate.rate, rate.updated_at)
+            for from_id, rate in self.inverse(cid).items()
+            if rate.rate
+        )
+        return edges
+
+    def cross_rate(self, from_id: int, to_id: int) -> float | None:
+        """
+        Вычисление кросс-курса через граф котировок.
+
+        Выполняется обход в ширину по уровням: из путей минимальной длины
+        выбирается самый свежий, то есть тот, у которого самый старый курс
+        на пути обновлен позже всего.
+
+        :param from_id: идентификатор конвертируемой валюты.
+        :param to_id: идентификатор валюты, в которую конвертируется.
+        :return: кросс-курс, если валюты связаны, иначе None.
+        """
+        visited: set[int] = {from_id}
+        level: dict[int, _PathState] = {from_id: (1.0, datetime.max)}
+        while level:
+            next_level: dict[int, _PathState] = {}
+            for cid, (rate, freshness) in level.items():
+                for neighbour, edge_rate, updated_at in self._edges(cid):
+                    if neighbour in visited:
+                        continue
+                    state = (rate * edge_rate, min(freshness, updated_at))
+                    known = next_level.get(neighbour)
+                    if known is None or state[1] > known[1]:
+                        next_level[neighbour] = state
+            if to_id in next_level:
+                return next_level[to_id][0]
+            visited.update(next_level)
+            level = next_level
+        return None
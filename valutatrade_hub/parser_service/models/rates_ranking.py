@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+
+from .rate import PairKey, Rate, RatesType, format_rate_key
+
+#: элемент рейтинга: (курс со знаком минус, ключ курса)
+_RankingEntry = tuple[float, PairKey]
+
+
+class RatesRanking:
+    """
+    Рейтинг курсов валют по убыванию.
+
+    Курсы нормализуются так, чтобы значение было не меньше 1: курс меньше 1
+    заменяется обратным с переставленными валютами в ключе. Элементы хранятся
+    в отсортированном списке, поэтому топ-N получается срезом, а обновление
+    одного курса выполняется бинарным поиском без полной пересортировки.
+
+    :param pairs: словарь курсов валют вида
+        {(from_currency_id, to_currency_id): Rate}.
+    """
+    def __init__(self, pairs: RatesType | None = None):
+        #: {исходный ключ курса: элемент рейтинга}
+        self._entries: dict[PairKey, _RankingEntry] = {}
+        #: элементы рейтинга, отсортированные по возрастанию
+        self._sorted: list[_RankingEntry] = []
+        if pairs:
+            for key, rate in pairs.items():
+                display_key, value = self._normalize(key, rate)
+                self._entries[key] = (-value, display_key)
+            self._sorted = sorted(self._entries.values())
+
+    @staticmethod
+    def _normalize(key: PairKey, rate: Rate) -> tuple[PairKey, float]:
+        """
+        Нормализация курса.
+
+        :param key: ключ курса.
+        :param rate: курс.
+        :return: ключ курса для вывода и значение курса.
+        """
+        if 1 > rate.rate > 0:
+            return (key[1], key[0]), 1 / rate.rate
+        return key, rate.rate
+
+    def copy(self) -> "RatesRanking":
+        """
+        :return: копия рейтинга.
+        """
+        ranking = RatesRanking()
+        ranking._entries = self._entries.copy()
+        ranking._sorted = self._sorted.copy()
+        return ranking
+
+    def update(self, pairs: RatesType) -> None:
+        """
+        Добавление (замена) курсов в рейтинге.
+
+        :param pairs: словарь курсов валют вида
+            {(from_currency_id, to_currency_id): Rate}.
+        :return: None.
+        """
+        for key, rate in pairs.items():
+            display_key, value = self._normalize(key, rate)
+            entry = (-value, display_key)
+            old_entry = self._entries.get(key)
+            if old_entry == entry:
+                continue
+            if old_entry is not None:
+                del self._sorted[bisect_left(self._sorted, old_entry)]
+            insort(self._sorted, entry)
+            self._entries[key] = entry
+
+    def top(self, count: int) -> dict[str, float]:
+        """
+        Получение топа курсов.
+
+        :param count: количество курсов в топе.
+        :return: словарь вида {"FROM_TO": курс}.
+        """
+        top: dict[str, float] = {}
+        for value, key in self._sorted:
+            if len(top) >= count:
+                break
+            # курсы A_B и B_A нормализуются к одному ключу: в топ попадает
+            # больший из них
+            top.setdefault(format_rate_key(key), -value)
+        return top
@@ -0,0 +1,84 @@
+from collections.abc import Callable
+from threading import Condition, Lock
+from typing import NamedTuple
+
+from .storage import Storage
+
+
+class RatesSnapshot(NamedTuple):
+    """
+    Опубликованная версия хранилища курсов валют.
+    """
+    #: номер версии, монотонно возрастает с каждым обновлением
+    version: int
+    storage: Storage
+
+
+class SnapshotPublisher:
+    """
+    Публикация версий хранилища курсов валют по схеме copy-on-write.
+
+    Опубликованные хранилища не изменяются. Писатель строит следующую версию
+    в стороне от читателей и публикует ее заменой одной ссылки, поэтому
+    читатели не берут блокировок и не видят частично обновленных данных.
+    Писатели упорядочиваются между собой, чтобы версии не терялись.
+    """
+    def __init__(self):
+        self._current: RatesSnapshot | None = None
+        self._write_lock = Lock()
+        self._published = Condition()
+
+    @property
+    def current(self) -> RatesSnapshot | None:
+        """
+        :return: последняя опубликованная версия.
+        """
+        return self._current
+
+    def publish(
+            self,
+            build: Callable[[Storage | None], Storage]
+    ) -> RatesSnapshot:
+        """
+        Публикация новой версии.
+
+        :param build: функция, строящая новое хранилище по текущему
+            (None, если еще ничего не опубликовано).
+
+        :return: опубликованная версия.
+        """
+        with self._write_lock:
+            current = self._current
+            storage = build(current.storage if current else None)
+            snapshot = RatesSnapshot(
+                current.version + 1 if current else 1,
+                storage
+            )
+            self._current = snapshot
+        with self._published:
+            self._published.notify_all()
+        return snapshot
+
+    def wait(
+            self,
+            version: int,
+            timeout: float | None = None
+    ) -> RatesSnapshot | None:
+        """
+        Ожидание публикации версии новее указанной.
+
+        :param version: номер последней известной версии (0, если версии
+            еще не известны).
+        :param timeout: максимальное время ожидания (в секундах).
+
+        :return: последняя опубликованная версия или None, если за время
+            ожидания новая версия не опубликована.
+        """
+        def published() -> bool:
+            current = self._current
+            return current is not None and current.version > version
+
+        with self._published:
+            if not self._published.wait_for(published, timeout):
+                return None
+        return self._current
@@ -1,9 +1,16 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import NamedTuple
+from types import MappingProxyType
 
 from ..exception import UnknownRateError
-from .rate import Rate, RatesType, parse_rate_key, rate_key
+from .currency_ids import currency_code, find_currency_id
+from .rate import PairKey, Rate, RatesType, format_rate_key, load_rate_key
+from .rate_history import RateHistory
+from .rate_vector import RateVector, numpy_available
+from .rates_index import RatesIndex
+from .rates_ranking import RatesRanking
 
 RateDictType = dict[str, float]
 
@@ -13,12 +20,63 @@ class StorageJsonKey(Enum):
     last_refresh = "last_refresh"
 
 
-class Storage(NamedTuple):
+@dataclass
+class Storage:
     """
     Класс хранилища данных о курсах валют.
+
+    Курсы хранятся по ключам из идентификаторов валют (см. currency_ids).
+    При создании строится индекс курсов по валютам (см. RatesIndex).
+
+    Переданный словарь курсов копируется и доступен только для чтения,
+    поэтому экземпляр можно безопасно читать из нескольких потоков. Новые
+    курсы добавляются созданием нового экземпляра (см. merge).
+
+    Для каждой пары хранится история курсов (см. RateHistory), по которой
+    выполняется поиск курсов на момент времени (см. get_rate, as_of).
+    Текущие курсы всегда входят в историю. История не сохраняется в JSON.
     """
-    pairs: RatesType
+    pairs: Mapping[PairKey, Rate]
     last_refresh: datetime
+    #: истории курсов вида {(from_currency_id, to_currency_id): RateHistory}
+    history: Mapping[PairKey, RateHistory] = field(
+        repr=False, compare=False, default_factory=dict
+    )
+    #: максимальное количество курсов в истории пары (см. RateHistory.add)
+    max_history_len: int | None = field(
+        repr=False, compare=False, default=None
+    )
+    #: время обновления самого старого курса каждого источника вида
+    #: {имя источника: время} (см. RatesUpdater.stale_clients)
+    source_updated_at: Mapping[str, datetime] = field(
+        init=False, repr=False, compare=False
+    )
+    _index: RatesIndex = field(init=False, repr=False, compare=False)
+    #: вычисленные кросс-курсы вида {(from_currency_id, to_currency_id): курс}
+    _cross_rates: dict[tuple[int, int], float | None] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+    _ranking: RatesRanking | None = field(
+        init=False, repr=False, compare=False, default=None
+    )
+    #: векторы курсов вида {базовая валюта: RateVector}
+    _rate_vectors: dict[str, RateVector] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+
+    def __post_init__(self):
+        self.pairs = MappingProxyType(dict(self.pairs))
+        history = dict(self.history)
+        source_updated_at: dict[str, datetime] = {}
+        for key, rate in self.pairs.items():
+            history[key] = history[key].add(rate, self.max_history_len) \
+                if key in history else RateHistory([rate])
+            oldest = source_updated_at.get(rate.source)
+            if oldest is None or rate.updated_at < oldest:
+                source_updated_at[rate.source] = rate.updated_at
+        self.history = MappingProxyType(history)
+        self.source_updated_at = MappingProxyType(source_updated_at)
+        self._index = RatesIndex(self.pairs)
 
     def get_exchange_rate(self, currency: str) -> RateDictType:
         """
@@ -29,21 +87,58 @@ class Storage(NamedTuple):
 
         :return: словарь с курсами валют вида {код валюты: курс}.
         """
-        rates: RateDictType = {}
-        for key, value in self.pairs.items():
-            fc, tc = parse_rate_key(key)
-            if currency == fc:
-                rates[tc] = value.rate
-            elif currency == tc:
-                rates[fc] = 1 / value.rate
+        cid = find_currency_id(currency)
+        if cid is None:
+            return {}
+        rates: RateDictType = {
+            currency_code(from_id): 1 / value.rate
+            for from_id, value in self._index.inverse(cid).items()
+        }
+        rates.update(
+            (currency_code(to_id), value.rate)
+            for to_id, value in self._index.outgoing(cid).items()
+        )
         return rates
 
-    def get_rate(self, from_currency: str, to_currency: str) -> float:
+    def rate_vector(self, currency: str) -> RateVector | None:
+        """
+        Получение вектора курсов относительно валюты.
+
+        Вектор строится один раз для экземпляра хранилища.
+
+        :param currency: код валюты, относительно которой будут получены
+            курсы.
+
+        :return: вектор курсов, если установлен NumPy, иначе None.
+        """
+        if not numpy_available():
+            return None
+        if currency not in self._rate_vectors:
+            self._rate_vectors[currency] = RateVector(
+                currency, self.get_exchange_rate(currency)
+            )
+        return self._rate_vectors[currency]
+
+    def get_rate(
+            self,
+            from_currency: str,
+            to_currency: str,
+            timestamp: datetime | None = None
+    ) -> float:
         """
         Получение курса валюты.
 
+        Если прямого или обратного курса нет, то курс вычисляется через
+        промежуточные валюты (см. RatesIndex.cross_rate). Вычисленные
+        кросс-курсы кешируются в рамках экземпляра хранилища.
+
         :param from_currency: код конвертируемой валюты.
         :param to_currency: код валюты, в которую конвертируется.
+        :param timestamp: момент времени. Если указан, то возвращается курс,
+            действовавший в этот момент: прямой и обратный курсы ищутся
+            бинарным поиском по истории пары, кросс-курс вычисляется по
+            хранилищу на этот момент (см. as_of).
+
         :return: курс валюты.
 
         :raises valutatrade_hub.parser_service.exception.UnknownRateError:
@@ -51,58 +146,148 @@ class Storage(NamedTuple):
         """
         if from_currency == to_currency:
             return 1
-        rate = self._get_rate(from_currency, to_currency)
+        from_id = find_currency_id(from_currency)
+        to_id = find_currency_id(to_currency)
+        if from_id is None or to_id is None:
+            raise UnknownRateError(from_currency, to_currency)
+        if timestamp is not None:
+            rate = self._get_history_rate(from_id, to_id, timestamp)
+            if rate is None:
+                rate = self.as_of(timestamp)._get_cross_rate(from_id, to_id)
+            if rate:
+                return rate
+            raise UnknownRateError(from_currency, to_currency)
+        rate = self._get_rate(from_id, to_id)
         if rate:
             return rate
-        rate = self._get_rate(to_currency, from_currency)
+        rate = self._get_rate(to_id, from_id)
         if rate:
             return 1 / rate
-        else:
-            raise UnknownRateError(from_currency, to_currency)
+        rate = self._get_cross_rate(from_id, to_id)
+        if rate:
+            return rate
+        raise UnknownRateError(from_currency, to_currency)
 
-    def _get_rate(self, from_currency: str, to_currency: str) -> float | None:
+    def find_rate(self, from_currency: str, to_currency: str) -> Rate | None:
         """
-        Получение курса валюты из внутреннего хранилища.
+        Поиск записи о прямом или обратном курсе валюты.
+
         :param from_currency: код конвертируемой валюты.
         :param to_currency: код валюты, в которую конвертируется.
+        :return: запись о курсе; None для кросс-курсов и неизвестных пар.
+        """
+        from_id = find_currency_id(from_currency)
+        to_id = find_currency_id(to_currency)
+        if from_id is None or to_id is None:
+            return None
+        return self._index.outgoing(from_id).get(to_id) or \
+            self._index.outgoing(to_id).get(from_id)
+
+    def _get_rate(self, from_id: int, to_id: int) -> float | None:
+        """
+        Получение курса валюты из внутреннего хранилища.
+        :param from_id: идентификатор конвертируемой валюты.
+        :param to_id: идентификатор валюты, в которую конвертируется.
         :return: курс валюты, если найден, иначе None.
         """
-        key: str = rate_key(from_currency, to_currency)
-        try:
-            rate: Rate = self.pairs[key]
+        rate: Rate | None = self._index.outgoing(from_id).get(to_id)
+        return rate.rate if rate else None
+
+    def _get_history_rate(
+            self,
+            from_id: int,
+            to_id: int,
+            timestamp: datetime
+    ) -> float | None:
+        """
+        Получение прямого или обратного курса на момент времени.
+
+        :param from_id: идентификатор конвертируемой валюты.
+        :param to_id: идентификатор валюты, в которую конвертируется.
+        :param timestamp: момент времени.
+        :return: курс валюты, если найден, иначе None.
+        """
+        history = self.history.get((from_id, to_id))
+        rate = history.as_of(timestamp) if history else None
+        if rate and rate.rate:
             return rate.rate
-        except KeyError:
-            return None
+        history = self.history.get((to_id, from_id))
+        rate = history.as_of(timestamp) if history else None
+        if rate and rate.rate:
+            return 1 / rate.rate
+        return None
+
+    def as_of(self, timestamp: datetime) -> "Storage":
+        """
+        Создание хранилища с курсами, действовавшими в указанный момент.
+
+        Курс каждой пары ищется бинарным поиском по ее истории. Полученное
+        хранилище поддерживает все операции (например, rate_vector для оценки
+        портфелей на момент времени).
+
+        :param timestamp: момент времени.
+        :return: новое хранилище.
+        """
+        pairs: RatesType = {}
+        for key, history in self.history.items():
+            rate = history.as_of(timestamp)
+            if rate:
+                pairs[key] = rate
+        return Storage(pairs=pairs, last_refresh=timestamp)
+
+    def _get_cross_rate(self, from_id: int, to_id: int) -> float | None:
+        """
+        Получение кросс-курса с кешированием.
+
+        :param from_id: идентификатор конвертируемой валюты.
+        :param to_id: идентификатор валюты, в которую конвертируется.
+        :return: кросс-курс, если валюты связаны, иначе None.
+        """
+        key = (from_id, to_id)
+        if key not in self._cross_rates:
+            self._cross_rates[key] = self._index.cross_rate(from_id, to_id)
+        return self._cross_rates[key]
 
     def top(self, count: int) -> RateDictType:
         """
         Получение топа валют по курсу.
 
+        Рейтинг строится один раз для экземпляра хранилища.
+
         :param count: количество валют в топе.
         :return: список валют с курсами.
         """
-        rates = {}
-        for key, value in self.pairs.items():
-            if 1 > value.rate > 0:
-                value = 1 / value.rate
-                fc, tc = parse_rate_key(key)
-                key = rate_key(tc, fc)
-            else:
-                value = value.rate
-            rates[key] = value
-        sorted_rates = sorted(
-            rates.items(),
-            key=lambda v: v[-1],
-            reverse=True
+        if self._ranking is None:
+            self._ranking = RatesRanking(self.pairs)
+        return self._ranking.top(count)
+
+    def merge(self, pairs: RatesType, last_refresh: datetime) -> "Storage":
+        """
+        Создание нового хранилища с добавленными (обновленными) курсами.
+
+        Текущий экземпляр не изменяется. Если рейтинг курсов уже был
+        построен, то он обновляется только для переданных курсов.
+
+        :param pairs: новые курсы вида
+            {(from_currency_id, to_currency_id): Rate}.
+        :param last_refresh: время обновления курсов.
+        :return: новое хранилище с дополненной историей курсов.
+        """
+        storage = Storage(
+            pairs=self.pairs | pairs,
+            last_refresh=last_refresh,
+            history=self.history,
+            max_history_len=self.max_history_len
         )
-        return {
-            key: value for key, value in sorted_rates[:count]
-        }
+        if self._ranking is not None:
+            storage._ranking = self._ranking.copy()
+            storage._ranking.update(pairs)
+        return storage
 
     @classmethod
     def load(cls, data: dict) -> "Storage":
         pairs = {
-            key: Rate(**value)
+            load_rate_key(key): Rate.load(value)
             for key, value in data[StorageJsonKey.pairs.value].items()
         }
         return cls(
@@ -115,7 +300,8 @@ class Storage(NamedTuple):
     def dump(self) -> dict:
         return {
             StorageJsonKey.pairs.value: {
-                key: value.dump() for key, value in self.pairs.items()
+                format_rate_key(key): value.dump()
+                for key, value in self.pairs.items()
             },
             StorageJsonKey.last_refresh.value: self.last_refresh.isoformat()
         }
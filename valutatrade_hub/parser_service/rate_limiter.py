@@ -0,0 +1,82 @@
+import threading
+from time import monotonic
+from typing import NamedTuple
+
+
+class RateLimit(NamedTuple):
+    """
+    Ограничение количества запросов к источнику.
+    """
+    #: количество запросов за период
+    requests: int
+    #: период (в секундах)
+    period: float
+    #: максимальное количество запросов подряд
+    burst: int
+
+
+class TokenBucket:
+    """
+    Ограничитель запросов по алгоритму token bucket.
+
+    Токены пополняются равномерно со скоростью requests / period в секунду,
+    но не больше burst. Каждый запрос расходует токен. Запросы резервируют
+    токены заранее (см. reserve): если токенов не хватает, то баланс
+    становится отрицательным, и запрос ждет своей очереди, поэтому
+    резервирования выполняются в порядке поступления.
+
+    :param limit: ограничение запросов.
+    """
+    def __init__(self, limit: RateLimit):
+        self._rate = limit.requests / limit.period
+        self._burst = limit.burst
+        self._tokens = float(limit.burst)
+        self._updated_at = monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """
+        :return: количество запросов, которые можно выполнить сейчас.
+        """
+        with self._lock:
+            self._refill()
+            return max(int(self._tokens), 0)
+
+    def delay(self, tokens: int) -> float:
+        """
+        Время ожидания токенов без их резервирования.
+
+        :param tokens: количество токенов.
+        :return: время (в секундах), через которое токены будут доступны.
+        """
+        with self._lock:
+            self._refill()
+            return self._delay(tokens)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Резервирование токенов.
+
+        :param tokens: количество токенов.
+        :return: время (в секундах), через которое можно выполнить запросы.
+        """
+        with self._lock:
+            self._refill()
+            delay = self._delay(tokens)
+            self._tokens -= tokens
+            return delay
+
+    def _delay(self, tokens: int) -> float:
+        # запрос больше burst токенов ждет полного ведра и уводит баланс в
+        # минус: следующие запросы ждут, пока долг не будет погашен
+        missing = min(tokens, self._burst) - self._tokens
+        return max(missing, 0) / self._rate
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._updated_at) * self._rate,
+            self._burst
+        )
+        self._updated_at = now
@@ -0,0 +1,104 @@
+import logging
+import random
+import threading
+from collections.abc import Callable
+from time import monotonic
+
+
+class RefreshScheduler:
+    """
+    Периодический запуск задачи в фоновом потоке.
+
+    Первый запуск выполняется сразу после start. Следующие запуски
+    планируются с шагом interval от предыдущего планового времени, к каждому
+    ожиданию добавляется случайная задержка до jitter секунд, чтобы запросы
+    разных процессов не совпадали по времени. Если задача выполнялась дольше
+    интервала, то пропущенные запуски не догоняются, а объединяются в один.
+
+    Ошибки задачи логируются и не останавливают планировщик.
+
+    :param task: задача.
+    :param interval: интервал запуска (в секундах).
+    :param jitter: максимальная случайная задержка запуска (в секундах).
+    :param name: имя потока.
+    """
+    def __init__(
+            self,
+            task: Callable[[], None],
+            interval: float,
+            jitter: float = 0,
+            name: str = "scheduler"
+    ):
+        if interval <= 0:
+            raise ValueError("Интервал должен быть больше 0")
+        self._task = task
+        self._interval = interval
+        self._jitter = jitter
+        self._name = name
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(name)
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True, если планировщик запущен.
+        """
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Запуск планировщика.
+
+        Повторный вызов для запущенного планировщика ничего не делает.
+
+        :return: None.
+        """
+        with self._lock:
+            if self.running:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=self._name, daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Остановка планировщика.
+
+        Ожидание прерывается сразу; выполняющаяся задача завершается до
+        конца (но не дольше timeout).
+
+        :param timeout: максимальное время ожидания завершения (в секундах).
+        :return: None.
+        """
+        with self._lock:
+            self._stop_event.set()
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        """
+        Цикл планировщика.
+
+        :return: None.
+        """
+        next_run = monotonic()
+        delay = 0.0
+        while not self._stop_event.wait(delay):
+            try:
+                self._task()
+            except Exception as e:
+                self._logger.error(f"Scheduled task failed: {e}")
+            next_run += self._interval
+            now = monotonic()
+            if next_run <= now:
+                missed = int((now - next_run) // self._interval) + 1
+                self._logger.warning(f"Skipped {missed} scheduled run(s)")
+                next_run += missed * self._interval
+            delay = next_run - now + random.uniform(0, self._jitter)
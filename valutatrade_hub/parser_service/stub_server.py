@@ -0,0 +1,494 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+#: путь API CoinGecko (см. ParserConfig.coingecko_url)
+COINGECKO_PATH = "/api/v3/simple/price"
+#: префикс путей ExchangeRate-API (см. ParserConfig.exchangerate_api_url)
+EXCHANGERATE_PATH = "/v6"
+#: путь статистики заглушки
+STATS_PATH = "/stats"
+
+#: валюты ответа ExchangeRate-API; до payload_size дополняются
+#: сгенерированными кодами
+_FIAT_CURRENCIES = (
+    "USD", "EUR", "GBP", "RUB", "JPY", "CNY", "CHF", "CAD", "AUD", "SEK"
+)
+
+
+class StubSettings(NamedTuple):
+    """
+    Параметры заглушки API.
+    """
+    #: задержка ответа (в миллисекундах)
+    latency_ms: float = 0
+    #: максимальная случайная добавка к задержке (в миллисекундах)
+    latency_jitter_ms: float = 0
+    #: доля ответов с ошибкой (от 0 до 1)
+    error_rate: float = 0
+    #: код ответа с ошибкой
+    error_status: int = HTTPStatus.SERVICE_UNAVAILABLE
+    #: количество курсов в ответе ExchangeRate-API
+    payload_size: int = len(_FIAT_CURRENCIES)
+    #: период изменения курсов (в секундах); в течение периода ответы не
+    #: меняются, и условные запросы получают 304
+    rates_period: float = 60
+    #: начальное значение генератора случайных чисел
+    seed: int | None = None
+    #: путь к файлу записанных ответов для воспроизведения
+    replay_path: Path | None = None
+    #: путь к файлу для записи ответов реальных API
+    record_path: Path | None = None
+    #: url API CoinGecko для записи
+    upstream_coingecko_url: str = \
+        "https://api.coingecko.com/api/v3/simple/price"
+    #: url ExchangeRate-API для записи
+    upstream_exchangerate_url: str = "https://v6.exchangerate-api.com/v6"
+
+
+class _StubResponse(NamedTuple):
+    """
+    Ответ заглушки.
+    """
+    status: int
+    headers: dict[str, str]
+    body: str
+
+
+class ProviderStubServer:
+    """
+    Локальная заглушка API CoinGecko и ExchangeRate-API.
+
+    Ответы повторяют формат реальных API, поэтому клиенты парсера работают
+    с заглушкой без изменений: достаточно указать в конфигурации парсера
+    coingecko_url и exchangerate_api_url (см. coingecko_url и
+    exchangerate_api_url). Заглушка поддерживает ETag и условные запросы,
+    задержку, долю ошибок и размер ответа (см. StubSettings).
+
+    Ответы генерируются детерминированно по времени и коду валюты. В режиме
+    записи запросы перенаправляются в реальные API, а ответы сохраняются в
+    файл; в режиме воспроизведения ответы берутся из этого файла.
+
+    :param settings: параметры заглушки.
+    :param host: адрес сервера.
+    :param port: порт сервера (0 - любой свободный).
+    """
+    def __init__(
+            self,
+            settings: StubSettings = StubSettings(),
+            host: str = "127.0.0.1",
+            port: int = 0
+    ):
+        self._settings = settings
+        self._random = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        #: количество ответов вида {(путь, код ответа): количество}
+        self._stats: Counter[tuple[str, int]] = Counter()
+        self._recorded: dict[str, dict] = {}
+        if settings.replay_path is not None:
+            with open(settings.replay_path) as file:
+                self._recorded = json.load(file)
+        self._upstream = requests.Session()
+        self._server = ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """
+        :return: адрес сервера.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def coingecko_url(self) -> str:
+        """
+        :return: значение coingecko_url для конфигурации парсера.
+        """
+        return self.url + COINGECKO_PATH
+
+    @property
+    def exchangerate_api_url(self) -> str:
+        """
+        :return: значение exchangerate_api_url для конфигурации парсера.
+        """
+        return self.url + EXCHANGERATE_PATH
+
+    @property
+    def stats(self) -> dict[str, dict[int, int]]:
+        """
+        :return: количество ответов вида {путь: {код ответа: количество}}.
+        """
+        with self._lock:
+            stats: dict[str, dict[int, int]] = {}
+            for (path, status), count in self._stats.items():
+                stats.setdefault(path, {})[status] = count
+            return stats
+
+    def start(self) -> None:
+        """
+        Запуск сервера в фоновом потоке.
+
+        :return: None.
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="provider-stub",
+            daemon=True
+        )
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """
+        Обработка запросов в текущем потоке до вызова stop.
+
+        :return: None.
+        """
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        """
+        Остановка сервера и сохранение записанных ответов.
+
+        :return: None.
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        self._upstream.close()
+        self.save_records()
+
+    def save_records(self) -> None:
+        """
+        Сохранение записанных ответов в режиме записи.
+
+        :return: None.
+        """
+        if self._settings.record_path is None:
+            return
+        with self._lock:
+            data = json.dumps(self._recorded, indent=2, ensure_ascii=False)
+        self._settings.record_path.write_text(data)
+
+    def respond(
+            self,
+            path: str,
+            headers: dict[str, str]
+    ) -> _StubResponse:
+        """
+        Формирование ответа на запрос.
+
+        :param path: путь запроса с параметрами.
+        :param headers: заголовки запроса.
+        :return: ответ.
+        """
+        route = urlsplit(path).path
+        if route == STATS_PATH:
+            return _json_response(HTTPStatus.OK, self.stats)
+        settings = self._settings
+        with self._lock:
+            delay = settings.latency_ms + \
+                self._random.uniform(0, settings.latency_jitter_ms)
+            failed = self._random.random() < settings.error_rate
+        if delay:
+            time.sleep(delay / 1000)
+        if failed:
+            response = _json_response(
+                settings.error_status,
+                {"error": HTTPStatus(settings.error_status).phrase}
+            )
+        elif settings.replay_path is not None:
+            response = self._replay(path)
+        elif settings.record_path is not None:
+            response = self._record(path)
+        else:
+            response = self._generate(path)
+        etag = response.headers.get("ETag")
+        if response.status == HTTPStatus.OK and etag is not None and \
+                headers.get("If-None-Match") == etag:
+            response = _StubResponse(
+                HTTPStatus.NOT_MODIFIED, {"ETag": etag}, ""
+            )
+        with self._lock:
+            self._stats[(route, int(response.status))] += 1
+        return response
+
+    def _generate(self, path: str) -> _StubResponse:
+        """
+        Генерация ответа в формате реального API.
+
+        :param path: путь запроса с параметрами.
+        :return: ответ.
+        """
+        parts = urlsplit(path)
+        params = dict(parse_qsl(parts.query))
+        period = int(time.time() // self._settings.rates_period)
+        if parts.path == COINGECKO_PATH:
+            vs_currencies = params.get("vs_currencies", "usd").lower()
+            # цены криптовалют - в тысячах единиц валюты
+            body = {
+                coin_id: {
+                    vs_currency:
+                        1000 * _price(f"{coin_id}/{vs_currency}", period)
+                    for vs_currency in vs_currencies.split(",")
+                }
+                for coin_id in params.get("ids", "").split(",") if coin_id
+            }
+            return _json_response(HTTPStatus.OK, body, period)
+        segments = parts.path.removeprefix(EXCHANGERATE_PATH).split("/")
+        if parts.path.startswith(EXCHANGERATE_PATH) and \
+                len(segments) == 4 and segments[2] == "latest":
+            base = segments[3].upper()
+            currencies = _currencies(self._settings.payload_size, base)
+            base_price = _currency_price(base, period)
+            body = {
+                "result": "success",
+                "base_code": base,
+                "time_last_update_unix": int(
+                    period * self._settings.rates_period
+                ),
+                "conversion_rates": {
+                    currency: _currency_price(currency, period) / base_price
+                    for currency in currencies
+                }
+            }
+            return _json_response(HTTPStatus.OK, body, period)
+        return _json_response(HTTPStatus.NOT_FOUND, {"error": "Not Found"})
+
+    def _record(self, path: str) -> _StubResponse:
+        """
+        Перенаправление запроса в реальный API и запись ответа.
+
+        :param path: путь запроса с параметрами.
+        :return: ответ реального API.
+        """
+        parts = urlsplit(path)
+        if parts.path == COINGECKO_PATH:
+            url = self._settings.upstream_coingecko_url
+        elif parts.path.startswith(EXCHANGERATE_PATH):
+            url = self._settings.upstream_exchangerate_url + \
+                parts.path.removeprefix(EXCHANGERATE_PATH)
+        else:
+            return _json_response(
+                HTTPStatus.NOT_FOUND, {"error": "Not Found"}
+            )
+        if parts.query:
+            url = f"{url}?{parts.query}"
+        try:
+            upstream = self._upstream.get(url, timeout=30)
+        except requests.RequestException as e:
+            return _json_response(HTTPStatus.BAD_GATEWAY, {"error": str(e)})
+        response = _StubResponse(
+            upstream.status_code,
+            {
+                name: upstream.headers[name]
+                for name in ("Content-Type", "ETag", "Last-Modified")
+                if name in upstream.headers
+            },
+            upstream.text
+        )
+        with self._lock:
+            self._recorded[_record_key(path)] = response._asdict()
+        return response
+
+    def _replay(self, path: str) -> _StubResponse:
+        """
+        Воспроизведение записанного ответа.
+
+        :param path: путь запроса с параметрами.
+        :return: записанный ответ или 404, если ответ не записан.
+        """
+        recorded = self._recorded.get(_record_key(path))
+        if recorded is None:
+            return _json_response(
+                HTTPStatus.NOT_FOUND, {"error": "Response is not recorded"}
+            )
+        return _StubResponse(**recorded)
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        stub: ProviderStubServer = self.server.stub
+        response = stub.respond(self.path, dict(self.headers))
+        body = response.body.encode()
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # запросы не логируются, чтобы не искажать замеры
+        pass
+
+
+def _json_response(
+        status: int,
+        body: dict,
+        period: int | None = None
+) -> _StubResponse:
+    """
+    Формирование JSON-ответа.
+
+    :param status: код ответа.
+    :param body: тело ответа.
+    :param period: период изменения курсов; если указан, то ответ получает
+        ETag.
+
+    :return: ответ.
+    """
+    data = json.dumps(body)
+    headers = {"Content-Type": "application/json"}
+    if period is not None:
+        digest = hashlib.sha1(data.encode()).hexdigest()
+        headers["ETag"] = f'"{digest}"'
+    return _StubResponse(status, headers, data)
+
+
+def _price(name: str, period: int) -> float:
+    """
+    Детерминированная цена в диапазоне [0.5, 1.5) для периода.
+
+    :param name: имя инструмента.
+    :param period: номер периода изменения курсов.
+    :return: цена.
+    """
+    digest = hashlib.sha1(f"{name}:{period}".encode()).digest()
+    return 0.5 + int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def _currency_price(currency: str, period: int) -> float:
+    """
+    :param currency: код валюты.
+    :param period: номер периода изменения курсов.
+    :return: цена валюты в условных единицах (для USD - 1).
+    """
+    return 1.0 if currency == "USD" else _price(currency, period)
+
+
+def _currencies(count: int, base: str) -> list[str]:
+    """
+    Список валют ответа ExchangeRate-API.
+
+    :param count: количество валют.
+    :param base: базовая валюта (всегда входит в список).
+    :return: список кодов валют.
+    """
+    currencies = list(dict.fromkeys((base, *_FIAT_CURRENCIES)))
+    index = 0
+    while len(currencies) < count:
+        currencies.append(f"X{index:03d}")
+        index += 1
+    return currencies[:max(count, 1)]
+
+
+def _record_key(path: str) -> str:
+    """
+    Ключ записанного ответа.
+
+    Ключ API ExchangeRate-API в пути заменяется на "-", чтобы записи
+    воспроизводились с любым ключом; параметры запроса упорядочиваются.
+
+    :param path: путь запроса с параметрами.
+    :return: ключ.
+    """
+    parts = urlsplit(path)
+    route = parts.path
+    if route.startswith(EXCHANGERATE_PATH + "/"):
+        segments = route.split("/")
+        if len(segments) > 3:
+            segments[2] = "-"
+        route = "/".join(segments)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return f"{route}?{query}" if query else route
+
+
+def main():
+    parser = ArgumentParser(
+        description="ValutaTrade Hub: заглушка API курсов валют"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес сервера")
+    parser.add_argument("--port", type=int, default=8080, help="Порт сервера")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0,
+        help="Задержка ответа (в миллисекундах)"
+    )
+    parser.add_argument(
+        "--latency-jitter-ms", type=float, default=0,
+        help="Максимальная случайная добавка к задержке (в миллисекундах)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0,
+        help="Доля ответов с ошибкой (от 0 до 1)"
+    )
+    parser.add_argument(
+        "--error-status", type=int, default=HTTPStatus.SERVICE_UNAVAILABLE,
+        help="Код ответа с ошибкой"
+    )
+    parser.add_argument(
+        "--payload-size", type=int, default=len(_FIAT_CURRENCIES),
+        help="Количество курсов в ответе ExchangeRate-API"
+    )
+    parser.add_argument(
+        "--rates-period", type=float, default=60,
+        help="Период изменения курсов (в секундах)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Начальное значение генератора случайных чисел"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--record", type=Path, dest="record_path",
+        help="Записывать ответы реальных API в файл"
+    )
+    mode.add_argument(
+        "--replay", type=Path, dest="replay_path",
+        help="Воспроизводить ответы из файла"
+    )
+    args = parser.parse_args()
+    server = ProviderStubServer(
+        StubSettings(
+            latency_ms=args.latency_ms,
+            latency_jitter_ms=args.latency_jitter_ms,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            payload_size=args.payload_size,
+            rates_period=args.rates_period,
+            seed=args.seed,
+            replay_path=args.replay_path,
+            record_path=args.record_path
+        ),
+        args.host,
+        args.port
+    )
+    print(f"coingecko_url: {server.coingecko_url}")
+    print(f"exchangerate_api_url: {server.exchangerate_api_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Завершение работы...")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,49 @@
+import asyncio
+import json
 import logging
-from datetime import datetime
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
+from threading import Lock
+from time import sleep
 from traceback import extract_tb
+from types import MappingProxyType
 
 from requests import Response
 
 from valutatrade_hub.logger import Logger
 from valutatrade_hub.logging_config.log_record import LogRecord
 
-from .api_clients.abc import ApiHTTPError, BaseApiClient, ClientApiRequestError
+from .api_clients.abc import (
+    ApiHTTPError,
+    BaseApiClient,
+    ClientApiRequestError,
+    aiohttp_available,
+)
+from .circuit_breaker import CircuitBreaker, CircuitHealth, CircuitState
 from .config import ParserConfig
 from .log_record import HTTPLogRecord
-from .models import ExchangeRate
-from .models.rate import RatesType
+from .models import ExchangeRate, RatesSnapshot, SnapshotPublisher
+from .models.binary_storage import (
+    BinaryStorageError,
+    MappedStorage,
+    dump_binary,
+)
+from .models.history_store import HistoryStore
+from .models.rate import RatesType, load_rate_key, parse_rate_key
+from .models.rate_history import RatesHistoryType
 from .models.storage import Storage
-from .utils.files import write_file
+from .rate_limiter import TokenBucket
+from .scheduler import RefreshScheduler
+from .utils.files import write_binary_file, write_file
+
+#: задача опроса клиента: в пуле потоков или в событийном цикле
+_FetchFuture = Future | asyncio.Future
+#: хранилище курсов валют: в памяти или отображенное из файла
+RatesStorageType = Storage | MappedStorage
 
 
 class RatesUpdater:
@@ -38,10 +67,70 @@ class RatesUpdater:
                 "Все аргументы должны быть экземплярами класса BaseApiClient"
             )
         self._api_clients = api_clients
-        self._storage: Storage | None = None
+        self._publisher = SnapshotPublisher()
         self._config = config
         self._rates_file_path = config.data_path / "rates.json"
+        self._rates_binary_path = config.data_path / "rates.bin"
         self._exchanges_file_path = config.data_path / "exchanges_rates.json"
+        self._history_store = HistoryStore(
+            config.data_path / "history",
+            config.history_segment_size
+        )
+        #: время жизни курсов пар вида {(код валюты, код валюты): время};
+        #: курс пары ищется в обоих направлениях (см. Storage.find_rate)
+        self._pair_ttls: dict[tuple[str, str], timedelta] = {
+            parse_rate_key(load_rate_key(key)): ttl
+            for key, ttl in config.pair_ttl.items()
+        }
+        #: время последнего опроса клиентов вида {имя источника: время}
+        self._last_attempts: dict[str, datetime] = {}
+        #: номер изменения _last_attempts (см. _record_attempt)
+        self._attempts_version = 0
+        #: время устаревания курсов, вычисленное для последнего хранилища:
+        #: (хранилище, номер изменения _last_attempts, время жизни по
+        #: умолчанию, результат stale_at)
+        self._stale_at_cache: tuple[
+            RatesStorageType | None, int, timedelta, Mapping[str, datetime]
+        ] | None = None
+        #: клиенты опрашиваются параллельно, по потоку на клиента
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(api_clients), 1),
+            thread_name_prefix="rates-client"
+        )
+        #: последние задачи опроса клиентов
+        self._running: dict[BaseApiClient, _FetchFuture] = {}
+        self._running_lock = Lock()
+        #: выполняющиеся обновления вида {клиенты: результат обновления}
+        self._flights: dict[frozenset[BaseApiClient], Future] = {}
+        #: автоматические выключатели клиентов
+        self._breakers: dict[BaseApiClient, CircuitBreaker] = {
+            client: CircuitBreaker(
+                config.breaker_failure_threshold,
+                config.breaker_latency_threshold,
+                config.breaker_reset_timeout,
+                on_state_change=partial(self._log_circuit_state, client)
+            )
+            for client in api_clients
+        }
+        #: ограничители запросов клиентов (см. ParserConfig.rate_limits)
+        self._limiters: dict[BaseApiClient, TokenBucket] = {
+            client: TokenBucket(config.rate_limits[client.info.name])
+            for client in api_clients
+            if client.info.name in config.rate_limits
+        }
+        self._scheduler: RefreshScheduler | None = None
+        #: фоновое обновление устаревших курсов (см. revalidate)
+        self._revalidate_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="rates-revalidate"
+        )
+        self._revalidation: Future | None = None
+        #: последняя записанная в файлы версия вида (номер версии, время
+        #: изменения файла с курсами в наносекундах)
+        self._written: tuple[int, int | None] | None = None
+        #: получены журнальные записи, не записанные в exchanges_rates.json
+        self._history_changed = False
+        self._write_lock = Lock()
         self._logger: logging.Logger = logger.logger()
         self._log_dir_path: Path = logger.logs_dir_path
 
@@ -51,41 +140,693 @@ class RatesUpdater:
         self._console_logger.addHandler(console_handler)
 
     @property
-    def storage(self) -> Storage:
-        return self._storage
+    def storage(self) -> Storage | None:
+        snapshot = self._publisher.current
+        return snapshot.storage if snapshot else None
+
+    @property
+    def snapshot(self) -> RatesSnapshot | None:
+        """
+        :return: последняя опубликованная версия хранилища курсов валют.
+        """
+        return self._publisher.current
+
+    @property
+    def publisher(self) -> SnapshotPublisher:
+        """
+        :return: публикатор версий хранилища курсов валют.
+        """
+        return self._publisher
+
+    @property
+    def rates_file_path(self) -> Path:
+        """
+        :return: путь к файлу с курсами валют.
+        """
+        return self._rates_file_path
+
+    @property
+    def written(self) -> tuple[int, int | None] | None:
+        """
+        Версия хранилища, последней записанная в файл с курсами.
+
+        Версия публикуется раньше, чем записывается в файл, поэтому по
+        времени изменения файла читатели отличают запись опубликованной
+        версии от изменения файла другим процессом.
+
+        :return: номер версии и время изменения файла с курсами (в
+            наносекундах) или None, если файлы еще не записывались.
+        """
+        return self._written
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True, если запущено фоновое обновление курсов (см. start).
+        """
+        return self._scheduler is not None and self._scheduler.running
+
+    def start(self, default_ttl: timedelta) -> None:
+        """
+        Запуск фонового обновления курсов.
+
+        Каждые refresh_interval секунд (со случайной задержкой до
+        refresh_jitter секунд) обновляются курсы устаревших источников (см.
+        refresh_stale). Первое обновление выполняется сразу. Новые версии
+        хранилища публикуются так же, как при run_update.
+
+        Если курсы еще не публиковались, то первой версией публикуются
+        курсы из файла (см. _publish_rates_file), поэтому при запуске
+        опрашиваются только источники с устаревшими в файле курсами.
+
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: None.
+        """
+        def refresh() -> None:
+            self.refresh_stale(self.storage, default_ttl)
+
+        if self._publisher.current is None:
+            self._publish_rates_file()
+        if self._scheduler is None:
+            self._scheduler = RefreshScheduler(
+                refresh,
+                self._config.refresh_interval,
+                self._config.refresh_jitter,
+                name="rates-refresher"
+            )
+        self._scheduler.start()
+
+    def stop(self) -> None:
+        """
+        Остановка фонового обновления курсов.
+
+        Новые опросы не запускаются, ожидающие в очереди отменяются, а
+        выполняющиеся опросы и обновления завершаются (не дольше
+        update_deadline секунд). Затем журнальные записи клиентов
+        записываются в exchanges_rates.json и закрываются соединения
+        клиентов. После остановки курсы не обновляются.
+
+        :return: None.
+        """
+        deadline = self._config.update_deadline
+        if self._scheduler is not None:
+            self._scheduler.stop(deadline)
+            self._scheduler = None
+        self._revalidate_executor.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._running_lock:
+            running = [
+                future for future in (
+                    *self._running.values(), self._revalidation
+                )
+                if isinstance(future, Future)
+            ]
+        wait(running, timeout=deadline)
+        self._write_exchanges_file()
+        for client in self._api_clients:
+            client.close()
+
+    def health(self) -> dict[str, CircuitHealth]:
+        """
+        Получение состояния клиентов.
+
+        :return: словарь вида {имя источника: состояние автоматического
+            выключателя клиента}.
+        """
+        return {
+            client.info.name: breaker.health()
+            for client, breaker in self._breakers.items()
+        }
+
+    @property
+    def history_store(self) -> HistoryStore:
+        """
+        :return: постоянная история курсов валют.
+        """
+        return self._history_store
 
     def run_update(self, source: str | None = None):
         """
         Обновление данных.
 
+        Одновременные обновления одних и тех же клиентов объединяются (см.
+        _join_flight).
+
+        :param source: имя класса клиента. Если не указано, то будут опрошены
+            все клиенты.
+
         :return: None.
         """
-        self._console_logger.info("Starting rates update...")
-        last_refresh = datetime.now()
-        pairs, exchanges, errors = self._call_clients(source)
-        self._storage = Storage(
-            pairs=pairs,
-            last_refresh=last_refresh
+        self._update(self._filter_clients(source))
+
+    def refresh_stale(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> bool:
+        """
+        Обновление курсов только устаревших источников.
+
+        :param storage: текущее хранилище курсов валют (None, если курсов
+            еще нет).
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: True, если обновление выполнялось.
+        """
+        clients = self.stale_clients(storage, default_ttl)
+        if clients:
+            self._update(clients)
+        return bool(clients)
+
+    def revalidate(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> bool:
+        """
+        Запуск обновления устаревших курсов в фоне (см. refresh_stale).
+
+        Одновременно выполняется не больше одного такого обновления.
+
+        :param storage: текущее хранилище курсов валют (None, если курсов
+            еще нет).
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: True, если обновление запущено; False, если предыдущее
+            обновление еще выполняется.
+        """
+        with self._running_lock:
+            running = self._revalidation
+            if running is not None and not running.done():
+                return False
+            self._revalidation = self._revalidate_executor.submit(
+                self.refresh_stale, storage, default_ttl
+            )
+        return True
+
+    def stale_clients(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> list[BaseApiClient]:
+        """
+        Получение клиентов с устаревшими курсами.
+
+        Курсы источника устарели, если с момента обновления его самого
+        старого курса (Storage.source_updated_at) прошло больше времени
+        жизни источника (source_ttl) или если курс пары с заданным временем
+        жизни (pair_ttl) старше этого времени. Поэтому время жизни пары
+        действует, только если оно меньше времени жизни источника. Источник,
+        который опрашивался позже обновления курсов (например, запрос
+        завершился ошибкой), повторно опрашивается не раньше, чем через
+        время жизни курсов. Источник без курсов устарел, если он не
+        опрашивался в течение своего времени жизни.
+
+        Курсы отдельных пар не перебираются, поэтому проверка не зависит от
+        количества курсов. Время устаревания вычисляется один раз для
+        хранилища и пересчитывается только после опроса клиентов (см.
+        stale_at).
+
+        :param storage: текущее хранилище курсов валют (None, если курсов
+            еще нет).
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: список клиентов.
+        """
+        now = datetime.now()
+        stale_at = self.stale_at(storage, default_ttl)
+        return [
+            client for client in self._api_clients
+            if now >= stale_at[client.info.name]
+        ]
+
+    def stale_sources(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> set[str]:
+        """
+        Получение имен источников с устаревшими курсами (см. stale_clients).
+
+        :param storage: текущее хранилище курсов валют (None, если курсов
+            еще нет).
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: множество имен источников.
+        """
+        return {
+            client.info.name
+            for client in self.stale_clients(storage, default_ttl)
+        }
+
+    def stale_at(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> Mapping[str, datetime]:
+        """
+        Вычисление времени устаревания курсов источников (см.
+        stale_clients).
+
+        Результат кэшируется для последнего хранилища и сбрасывается при
+        опросе клиентов (см. _record_attempt).
+
+        :param storage: текущее хранилище курсов валют (None, если курсов
+            еще нет).
+        :param default_ttl: время жизни курсов источников, для которых оно не
+            задано в конфигурации (source_ttl).
+
+        :return: словарь вида {имя источника: время устаревания курсов}.
+        """
+        version = self._attempts_version
+        cache = self._stale_at_cache
+        if cache is not None and cache[0] is storage \
+                and cache[1:3] == (version, default_ttl):
+            return cache[3]
+        stale_at = MappingProxyType(
+            self._compute_stale_at(storage, default_ttl)
         )
-        self._write_files(exchanges)
+        self._stale_at_cache = (storage, version, default_ttl, stale_at)
+        return stale_at
+
+    def _compute_stale_at(
+            self,
+            storage: RatesStorageType | None,
+            default_ttl: timedelta
+    ) -> dict[str, datetime]:
+        """
+        Вычисление времени устаревания курсов источников без кэша (см.
+        stale_at).
+        """
+        updated = storage.source_updated_at if storage else {}
+        stale_at: dict[str, datetime] = {}
+        for client in self._api_clients:
+            name = client.info.name
+            ttl = self._config.source_ttl.get(name, default_ttl)
+            last_attempt = self._last_attempts.get(name)
+            updated_at = updated.get(name)
+            if updated_at is None:
+                stale_at[name] = last_attempt + ttl if last_attempt \
+                    else datetime.min
+                continue
+            if last_attempt is not None:
+                updated_at = max(updated_at, last_attempt)
+            stale_at[name] = updated_at + ttl
+        for (from_currency, to_currency), ttl in self._pair_ttls.items():
+            rate = storage.find_rate(from_currency, to_currency) \
+                if storage else None
+            if rate is None or rate.source not in stale_at:
+                continue
+            updated_at = max(
+                rate.updated_at,
+                self._last_attempts.get(rate.source, rate.updated_at)
+            )
+            stale_at[rate.source] = min(
+                stale_at[rate.source], updated_at + ttl
+            )
+        return stale_at
+
+    def _update(self, clients: Sequence[BaseApiClient]) -> None:
+        """
+        Обновление данных от указанных клиентов.
+
+        Если уже выполняется обновление тех же (или большего числа)
+        клиентов, то новое обновление не запускается: вызов дожидается
+        выполняющегося (см. _join_flight).
+
+        Если ни один клиент не опрашивался (см. _submit_clients), то курсы
+        не публикуются и файлы не перезаписываются.
+
+        :param clients: клиенты для получения данных о курсах валют.
+        :return: None.
+        """
+        flight, key = self._join_flight(clients)
+        if key is None:
+            flight.result()
+            return
+        with self._lead_flight(flight, key):
+            last_refresh = datetime.now()
+            results = self._call_clients(clients)
+            if results is not None:
+                self._complete_update(last_refresh, *results)
+
+    async def run_update_async(self, source: str | None = None) -> None:
+        """
+        Асинхронное обновление данных.
+
+        Клиенты опрашиваются конкурентно в текущем событийном цикле (см.
+        BaseApiClient.fetch_rates_async). Запись файлов выполняется в
+        отдельном потоке, чтобы не блокировать цикл.
+
+        :param source: имя класса клиента. Если не указано, то будут опрошены
+            все клиенты.
+
+        :return: None.
+
+        :raises RuntimeError: если не установлен aiohttp.
+        """
+        if not aiohttp_available():
+            raise RuntimeError(
+                "Для асинхронного обновления курсов требуется aiohttp"
+            )
+        clients = self._filter_clients(source)
+        flight, key = self._join_flight(clients)
+        if key is None:
+            await asyncio.wrap_future(flight)
+            return
+        with self._lead_flight(flight, key):
+            last_refresh = datetime.now()
+            results = await self._call_clients_async(clients)
+            if results is not None:
+                await asyncio.to_thread(
+                    self._complete_update, last_refresh, *results
+                )
+
+    def _join_flight(
+            self,
+            clients: Sequence[BaseApiClient]
+    ) -> tuple[Future, frozenset[BaseApiClient] | None]:
+        """
+        Присоединение к выполняющемуся обновлению клиентов.
+
+        Одновременные обновления одних и тех же клиентов объединяются: к
+        источникам выполняется один запрос, и файлы записываются один раз.
+        Обновление присоединяется к выполняющемуся, если оно опрашивает все
+        указанные клиенты; иначе регистрируется новое обновление.
+
+        :param clients: клиенты для получения данных о курсах валют.
+        :return: результат обновления и ключ нового обновления (None, если
+            вызов присоединился к выполняющемуся обновлению).
+        """
+        key = frozenset(clients)
+        with self._running_lock:
+            for running_key, flight in self._flights.items():
+                if key <= running_key:
+                    self._console_logger.info(
+                        "Joining rates update in progress..."
+                    )
+                    return flight, None
+            flight = Future()
+            self._flights[key] = flight
+        return flight, key
+
+    @contextmanager
+    def _lead_flight(
+            self,
+            flight: Future,
+            key: frozenset[BaseApiClient]
+    ) -> Iterator[None]:
+        """
+        Выполнение зарегистрированного обновления (см. _join_flight).
+
+        Результат (или ошибка) обновления передается присоединившимся
+        вызовам.
+
+        :param flight: результат обновления.
+        :param key: ключ обновления.
+        """
+        try:
+            yield
+        except BaseException as e:
+            self._end_flight(key)
+            flight.set_exception(e)
+            raise e
+        else:
+            self._end_flight(key)
+            flight.set_result(None)
+
+    def _end_flight(self, key: frozenset[BaseApiClient]) -> None:
+        """
+        Снятие обновления с регистрации: следующие вызовы запустят новое.
+
+        :param key: ключ обновления.
+        :return: None.
+        """
+        with self._running_lock:
+            del self._flights[key]
+
+    def _complete_update(
+            self,
+            last_refresh: datetime,
+            pairs: RatesType,
+            fetched: list[ExchangeRate],
+            errors: int
+    ) -> None:
+        """
+        Публикация и сохранение полученных курсов.
+
+        :param last_refresh: время начала обновления.
+        :param pairs: полученные курсы.
+        :param fetched: журнальные записи, полученные при этом обновлении.
+        :param errors: количество ошибок.
+        :return: None.
+        """
+        snapshot = self._publish(pairs, last_refresh)
+        with self._write_lock:
+            # параллельное обновление других клиентов могло уже записать
+            # более новую версию
+            written = self._written
+            if written is None or written[0] < snapshot.version:
+                self._write_files(snapshot.storage)
+                self._written = (snapshot.version, self._rates_file_mtime())
+        self._append_history(fetched)
         if errors:
             log = (f"Update completed with errors. "
                    f"Check {self._log_dir_path.absolute()} for details. ")
         else:
-            log = (f"Update successful. Total rates updated: {len(pairs)}. "
+            log = (f"Update successful. "
+                   f"Total rates updated: {len(snapshot.storage.pairs)}. "
                    f"Last refresh: {last_refresh.isoformat()}")
         self._console_logger.info(log)
 
+    def _publish(
+            self,
+            pairs: RatesType,
+            last_refresh: datetime
+    ) -> RatesSnapshot:
+        """
+        Публикация новой версии хранилища курсов валют.
+
+        Новое хранилище строится из текущего без его изменения (см.
+        SnapshotPublisher). Первое хранилище получает историю курсов из
+        постоянной истории.
+
+        :param pairs: полученные курсы.
+        :param last_refresh: время обновления курсов.
+        :return: опубликованная версия.
+        """
+        def build(current: Storage | None) -> Storage:
+            if current:
+                return current.merge(pairs, last_refresh)
+            return Storage(
+                pairs=pairs,
+                last_refresh=last_refresh,
+                history=self._load_history(),
+                max_history_len=self._config.max_history_len
+            )
+
+        return self._publisher.publish(build)
+
+    def _publish_rates_file(self) -> None:
+        """
+        Публикация курсов из файла с курсами первой версией хранилища.
+
+        Файл уже содержит эти курсы, поэтому он не перезаписывается (см.
+        written). Если файл не удалось прочитать, то ничего не публикуется.
+
+        :return: None.
+        """
+        try:
+            with open(self._rates_file_path) as file:
+                loaded = Storage.load(json.load(file))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            self._logger.error(
+                LogRecord(
+                    action="load_rates_file",
+                    result="error",
+                    error_type=e.__class__.__name__,
+                    error_message=str(e)
+                )
+            )
+            return
+
+        def build(current: Storage | None) -> Storage:
+            if current:
+                return current
+            return Storage(
+                pairs=dict(loaded.pairs),
+                last_refresh=loaded.last_refresh,
+                history=self._load_history(),
+                max_history_len=self._config.max_history_len
+            )
+
+        mtime = self._rates_file_mtime()
+        snapshot = self._publisher.publish(build)
+        with self._write_lock:
+            if self._written is None:
+                self._written = (snapshot.version, mtime)
+
+    def _load_history(self) -> RatesHistoryType:
+        """
+        Загрузка последних курсов пар из постоянной истории.
+
+        :return: истории курсов; пустой словарь, если не удалось прочитать
+            постоянную историю.
+        """
+        try:
+            return self._history_store.rate_histories(
+                self._config.max_history_len
+            )
+        except (OSError, ValueError) as e:
+            self._logger.error(
+                LogRecord(
+                    action="load_history",
+                    result="error",
+                    error_type=e.__class__.__name__,
+                    error_message=str(e)
+                )
+            )
+            return {}
+
     def _call_clients(
             self,
-            source: str | None
-    ) -> tuple[RatesType, list[ExchangeRate], int]:
+            clients: Sequence[BaseApiClient]
+    ) -> tuple[
+        RatesType, list[ExchangeRate], int
+    ] | None:
+        """
+        Получение курсов от клиентов.
+
+        Клиенты опрашиваются параллельно. Клиенты, не ответившие за
+        update_deadline секунд, считаются ошибкой; их запросы завершаются в
+        фоне, а полученные ими курсы не используются.
+
+        :param clients: клиенты для получения данных о курсах валют.
+
+        :return: полученные курсы, журнальные записи, полученные при этом
+            обновлении, количество ошибок; None, если ни один клиент не
+            опрашивался.
+        """
+        futures, skipped = self._submit_clients(
+            clients,
+            lambda client, delay: self._executor.submit(
+                self._client_fetch_rates, client, delay
+            )
+        )
+        if not self._start_update(futures, skipped):
+            return None
+        wait(futures.values(), timeout=self._config.update_deadline)
+        return self._collect_results(clients, futures, skipped)
+
+    async def _call_clients_async(
+            self,
+            clients: Sequence[BaseApiClient]
+    ) -> tuple[
+        RatesType, list[ExchangeRate], int
+    ] | None:
+        """
+        Асинхронное получение курсов от клиентов.
+
+        Клиенты опрашиваются конкурентно в текущем событийном цикле с тем же
+        крайним сроком, что и в _call_clients.
+
+        :param clients: клиенты для получения данных о курсах валют.
+
+        :return: полученные курсы, журнальные записи, полученные при этом
+            обновлении, количество ошибок; None, если ни один клиент не
+            опрашивался.
+        """
+        futures, skipped = self._submit_clients(
+            clients,
+            lambda client, delay: asyncio.ensure_future(
+                self._client_fetch_rates_async(client, delay)
+            )
+        )
+        if not self._start_update(futures, skipped):
+            return None
+        await asyncio.wait(
+            futures.values(), timeout=self._config.update_deadline
+        )
+        return self._collect_results(clients, futures, skipped)
+
+    def _start_update(
+            self,
+            futures: dict[BaseApiClient, _FetchFuture],
+            skipped: dict[BaseApiClient, str]
+    ) -> bool:
+        """
+        Проверка, что опрошен хотя бы один клиент.
+
+        Если ни один клиент не опрашивался, то причины пишутся только в
+        лог: обновление без опроса не выводится в консоль, так как оно может
+        выполняться в фоне.
+
+        :param futures: задачи опроса клиентов.
+        :param skipped: причины, по которым клиенты не опрашивались.
+        :return: True, если обновление начато.
+        """
+        if futures:
+            self._console_logger.info("Starting rates update...")
+            return True
+        for client, reason in skipped.items():
+            self._logger.info(
+                LogRecord(
+                    action="update_rates",
+                    result="skipped",
+                    message={"client": client.info.name, "reason": reason}
+                )
+            )
+        return False
+
+    def _collect_results(
+            self,
+            clients: Sequence[BaseApiClient],
+            futures: dict[BaseApiClient, _FetchFuture],
+            skipped: dict[BaseApiClient, str]
+    ) -> tuple[
+        RatesType, list[ExchangeRate], int
+    ]:
+        """
+        Объединение результатов опроса клиентов.
+
+        :param clients: опрашиваемые клиенты.
+        :param futures: задачи опроса клиентов.
+        :param skipped: причины, по которым клиенты не опрашивались.
+
+        :return: полученные курсы, журнальные записи, полученные при этом
+            обновлении, количество ошибок.
+        """
         errors = 0
-        pairs: RatesType = self._storage.pairs.copy() if self._storage else {}
-        exchanges: list[ExchangeRate] = []
-        for client in self._filter_clients(source):
+        pairs: RatesType = {}
+        fetched: list[ExchangeRate] = []
+        # результаты объединяются в порядке клиентов, а не завершения
+        # запросов, поэтому при пересечении пар результат детерминирован
+        for client in clients:
+            future = futures.get(client)
+            if future is None:
+                self._console_logger.error(
+                    f"Failed to fetch from {client.info.name}: "
+                    f"{skipped[client]}"
+                )
+                errors += 1
+                continue
+            if not future.done() or future.cancelled():
+                self._console_logger.error(
+                    f"Failed to fetch from {client.info.name}: "
+                    f"deadline of {self._config.update_deadline} s exceeded"
+                )
+                errors += 1
+                continue
             try:
-                rates = self._client_fetch_rates(client)
+                rates = future.result()
             except Exception as e:
                 self._console_logger.error(
                     f"Failed to fetch from {client.info.name}: {e}"
@@ -93,12 +834,124 @@ class RatesUpdater:
                 errors += 1
             else:
                 pairs.update(rates)
-                exchanges.extend(client.history)
+                fetched.extend(client.last_fetch)
+                limiter = self._limiters.get(client)
+                quota = f", {limiter.remaining} requests left" \
+                    if limiter else ""
                 self._console_logger.info(
                     f"Fetching from {client.info.name}... OK "
-                    f"({len(rates)} rates)"
+                    f"({len(rates)} rates{quota})"
                 )
-        return pairs, exchanges, errors
+        if fetched:
+            self._history_changed = True
+        return pairs, fetched, errors
+
+    def _submit_clients(
+            self,
+            clients: Sequence[BaseApiClient],
+            submit: Callable[[BaseApiClient, float], _FetchFuture]
+    ) -> tuple[dict[BaseApiClient, _FetchFuture], dict[BaseApiClient, str]]:
+        """
+        Параллельный запуск опроса клиентов.
+
+        Клиент, запрос которого не завершился к крайнему сроку предыдущего
+        обновления, повторно не запускается, пока запрос не завершится.
+        Клиент с открытым автоматическим выключателем не опрашивается, но
+        попытка опроса регистрируется, поэтому его курсы не считаются
+        устаревшими до истечения времени жизни.
+
+        Для клиента с ограничением запросов (rate_limits) запросы
+        резервируются заранее: если их не хватает, то опрос ставится в
+        очередь и откладывается до появления запросов. Если ждать пришлось бы
+        дольше rate_limit_max_delay секунд, то опрос пропускается и, как
+        для отключенного клиента, регистрируется попытка опроса.
+
+        :param clients: клиенты для получения данных о курсах валют.
+        :param submit: функция запуска опроса клиента с задержкой (в
+            секундах).
+
+        :return: словари вида {клиент: задача опроса клиента} и {клиент:
+            причина, по которой клиент не опрашивается}.
+        """
+        futures: dict[BaseApiClient, _FetchFuture] = {}
+        skipped: dict[BaseApiClient, str] = {}
+        with self._running_lock:
+            for client in clients:
+                running = self._running.get(client)
+                if running is not None and not running.done():
+                    skipped[client] = "previous request is still running"
+                    continue
+                limiter = self._limiters.get(client)
+                requests = client.requests_per_fetch
+                if limiter is not None:
+                    delay = limiter.delay(requests)
+                    if delay > self._config.rate_limit_max_delay:
+                        skipped[client] = (
+                            f"rate limit exceeded ({requests} requests "
+                            f"needed, {limiter.remaining} left, "
+                            f"available in {delay:.1f} s)"
+                        )
+                        self._log_quota(client, "dropped", requests, delay)
+                        self._record_attempt(client)
+                        continue
+                if not self._breakers[client].allow():
+                    skipped[client] = "circuit is open"
+                    # повторный опрос - не раньше, чем через время жизни
+                    # курсов (см. stale_at)
+                    self._record_attempt(client)
+                    continue
+                delay = 0.0
+                if limiter is not None:
+                    delay = limiter.reserve(requests)
+                    self._log_quota(client, "reserved", requests, delay)
+                self._record_attempt(client)
+                futures[client] = submit(client, delay)
+                self._running[client] = futures[client]
+        return futures, skipped
+
+    def _record_attempt(self, client: BaseApiClient) -> None:
+        """
+        Регистрация времени опроса клиента (см. stale_at).
+
+        :param client: клиент для получения данных о курсах валют.
+        :return: None.
+        """
+        self._last_attempts[client.info.name] = datetime.now()
+        self._attempts_version += 1
+
+    def _log_quota(
+            self,
+            client: BaseApiClient,
+            result: str,
+            requests: int,
+            delay: float
+    ) -> None:
+        """
+        Логирование остатка запросов клиента.
+
+        :param client: клиент для получения данных о курсах валют.
+        :param result: результат резервирования запросов.
+        :param requests: количество запросов опроса.
+        :param delay: задержка опроса (в секундах).
+        :return: None.
+        """
+        self._logger.info(
+            LogRecord(
+                action="rate_limit",
+                result=result,
+                message={
+                    "client": client.info.name,
+                    "requests": requests,
+                    "remaining": self._limiters[client].remaining,
+                    "delay": round(delay, 3)
+                }
+            )
+        )
+        if result == "reserved" and delay:
+            self._console_logger.info(
+                f"Rate limit for {client.info.name}: fetch delayed by "
+                f"{delay:.1f} s"
+            )
 
     def _filter_clients(self, source: str) -> list[BaseApiClient]:
         """
@@ -118,16 +971,106 @@ class RatesUpdater:
             clients = self._api_clients
         return clients
 
-    def _client_fetch_rates(self, client: BaseApiClient) -> RatesType:
+    def _client_fetch_rates(
+            self,
+            client: BaseApiClient,
+            delay: float = 0
+    ) -> RatesType:
         """
         Вызов метода fetch_rates у клиента.
 
         :param client: клиент для получения данных о курсах валют.
+        :param delay: задержка вызова из-за ограничения запросов (в
+            секундах).
         :return: курсы валют.
         """
+        if delay:
+            sleep(delay)
+        with self._log_fetch(client), self._track_circuit(client):
+            return client.fetch_rates()
+
+    async def _client_fetch_rates_async(
+            self,
+            client: BaseApiClient,
+            delay: float = 0
+    ) -> RatesType:
+        """
+        Вызов метода fetch_rates_async у клиента.
+
+        :param client: клиент для получения данных о курсах валют.
+        :param delay: задержка вызова из-за ограничения запросов (в
+            секундах).
+        :return: курсы валют.
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        with self._log_fetch(client), self._track_circuit(client):
+            return await client.fetch_rates_async()
+
+    @contextmanager
+    def _track_circuit(self, client: BaseApiClient) -> Iterator[None]:
+        """
+        Регистрация результата опроса клиента и максимального времени ответа
+        на запрос (см. BaseApiClient.request_latency) в его автоматическом
+        выключателе.
+
+        :param client: клиент для получения данных о курсах валют.
+        """
+        breaker = self._breakers[client]
+        try:
+            yield
+        except Exception as e:
+            breaker.record_failure(f"{e.__class__.__name__}: {e}")
+            raise e
+        else:
+            breaker.record_success(client.request_latency)
+
+    def _log_circuit_state(
+            self,
+            client: BaseApiClient,
+            health: CircuitHealth
+    ) -> None:
+        """
+        Логирование смены состояния автоматического выключателя клиента.
+
+        :param client: клиент для получения данных о курсах валют.
+        :param health: новое состояние выключателя.
+        :return: None.
+        """
+        name = client.info.name
+        if health.state is CircuitState.open:
+            self._console_logger.warning(
+                f"Circuit for {name} is open after "
+                f"{health.consecutive_failures} failure(s): "
+                f"{health.last_error}. Next probe in "
+                f"{self._config.breaker_reset_timeout} s"
+            )
+        else:
+            self._console_logger.info(
+                f"Circuit for {name} is {health.state.value}"
+            )
+        self._logger.info(
+            LogRecord(
+                action="circuit_breaker",
+                result=health.state.value,
+                message={
+                    "client": name,
+                    "consecutive_failures": health.consecutive_failures,
+                    "last_error": health.last_error
+                }
+            )
+        )
+
+    @contextmanager
+    def _log_fetch(self, client: BaseApiClient) -> Iterator[None]:
+        """
+        Логирование результата получения курсов от клиента.
+
+        :param client: клиент для получения данных о курсах валют.
+        """
         action = "fetch_rates"
         try:
-            rates: RatesType = client.fetch_rates()
+            yield
         except ApiHTTPError as e:
             response: Response = e.response
             self._logger.error(
@@ -174,26 +1117,115 @@ class RatesUpdater:
                     message=client.info._asdict()
                 )
             )
-        return rates
 
-    def _write_files(self, exchanges: list[ExchangeRate]) -> None:
+    def _write_files(
+            self,
+            storage: Storage
+    ) -> None:
         """
-        Запись данных в файлы.
+        Запись курсов в файлы.
+
+        Журнальные записи клиентов не записываются: постоянная история (см.
+        HistoryStore) дописывается при каждом обновлении, а
+        exchanges_rates.json записывается при остановке (см. stop).
 
-        :param exchanges: список журнальных записей.
+        :param storage: хранилище курсов валют.
         :return: None.
         """
         write_file(
             self._rates_file_path,
-            self._storage.dump(),
+            storage.dump(),
             "write_rates_file"
         )
         self._console_logger.info(
-            f"Writing {len(self._storage.pairs)} rates to "
+            f"Writing {len(storage.pairs)} rates to "
             f"{self._rates_file_path.absolute()}..."
         )
+        self._write_binary_file(storage)
+
+    def _write_exchanges_file(self) -> None:
+        """
+        Запись журнальных записей клиентов (последние max_history_len
+        записей каждого клиента) в exchanges_rates.json.
+
+        Файл не перезаписывается, если в этом процессе курсы не были
+        получены.
+
+        :return: None.
+        """
+        if not self._history_changed:
+            return
         write_file(
             self._exchanges_file_path,
-            [record.dump() for record in exchanges],
+            [
+                record.dump()
+                for client in self._api_clients
+                for record in client.history
+            ],
             "write_exchanges_file"
         )
+        self._history_changed = False
+
+    def _rates_file_mtime(self) -> int | None:
+        """
+        :return: время изменения файла с курсами (в наносекундах) или None,
+            если файл не существует.
+        """
+        try:
+            return self._rates_file_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _write_binary_file(self, storage: Storage) -> None:
+        """
+        Запись двоичного снимка хранилища (см. dump_binary).
+
+        Если хранилище не удалось сериализовать, то снимок не записывается:
+        прежний снимок старше файла с курсами, поэтому читатели используют
+        файл с курсами (см. load_rates).
+
+        :param storage: хранилище курсов валют.
+        :return: None.
+        """
+        action = "write_rates_binary_file"
+        try:
+            data = dump_binary(storage)
+        except BinaryStorageError as e:
+            self._logger.error(
+                LogRecord(
+                    action=action,
+                    result="error",
+                    error_type=e.__class__.__name__,
+                    error_message=str(e)
+                )
+            )
+            return
+        write_binary_file(self._rates_binary_path, data, action)
+
+    def _append_history(self, fetched: list[ExchangeRate]) -> None:
+        """
+        Дозапись полученных журнальных записей в постоянную историю.
+
+        :param fetched: журнальные записи, полученные при обновлении.
+        :return: None.
+        """
+        action = "append_history"
+        try:
+            self._history_store.append(fetched)
+        except OSError as e:
+            self._logger.error(
+                LogRecord(
+                    action=action,
+                    result="error",
+                    error_type=e.__class__.__name__,
+                    error_message=str(e)
+                )
+            )
+        else:
+            self._logger.info(
+                LogRecord(
+                    action=action,
+                    result="success",
+                    message={"records": len(fetched)}
+                )
+            )
@@ -1,32 +1,63 @@
+import os
 import tempfile
-from json import JSONDecodeError, dumps
+from json import dumps
 from pathlib import Path
 
 from valutatrade_hub.logger import Logger
 from valutatrade_hub.logging_config.log_record import LogRecord
 
+#: маска прав создаваемых файлов текущего процесса
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 
 def write_file(path: Path, data: dict | list, action_name: str):
+    try:
+        payload = dumps(data, indent=4).encode()
+    except ValueError as e:
+        _log_write_error(path, action_name, e)
+    else:
+        write_binary_file(path, payload, action_name, ".json")
+
+
+def write_binary_file(
+        path: Path,
+        data: bytes,
+        action_name: str,
+        suffix: str = ".bin"
+):
+    """
+    Атомарная запись данных в файл.
+
+    Данные записываются во временный файл в той же директории, который
+    затем переименовывается, поэтому читатели никогда не видят файл
+    частично записанным. Файл получает права существующего файла (или
+    права нового файла с учетом umask, а не 0600 временного файла).
+    Временный файл удаляется, если запись не удалась.
+
+    :param path: путь к файлу.
+    :param data: данные.
+    :param action_name: название действия для лога.
+    :param suffix: расширение временного файла.
+    :return: None.
+    """
     logger = Logger().logger()
     log_message = {"path": str(path.absolute())}
+    temp_filename: Path | None = None
     try:
         with tempfile.NamedTemporaryFile(
-                suffix=".json",
+                suffix=suffix,
+                dir=path.parent,
                 delete=False
         ) as tmp_file:
             temp_filename = Path(tmp_file.name)
-            data = dumps(data, indent=4)
-            tmp_file.write(data.encode())
-        temp_filename.rename(path)
-    except (OSError, JSONDecodeError) as e:
-        logger.error(
-            LogRecord(
-                action=action_name,
-                result="error",
-                error_type=e.__class__.__name__,
-                message=log_message
-            )
-        )
+            tmp_file.write(data)
+        temp_filename.chmod(_file_mode(path))
+        temp_filename.replace(path)
+    except OSError as e:
+        if temp_filename is not None:
+            temp_filename.unlink(missing_ok=True)
+        _log_write_error(path, action_name, e)
     else:
         logger.info(
             LogRecord(
@@ -34,4 +65,27 @@ def write_file(path: Path, data: dict | list, action_name: str):
                 result="success",
                 message=log_message
             )
-        )
\ No newline at end of file
+        )
+
+
+def _file_mode(path: Path) -> int:
+    """
+    :param path: путь к файлу.
+    :return: права существующего файла или права нового файла с учетом
+        umask.
+    """
+    try:
+        return path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def _log_write_error(path: Path, action_name: str, error: Exception):
+    Logger().logger().error(
+        LogRecord(
+            action=action_name,
+            result="error",
+            error_type=error.__class__.__name__,
+            message={"path": str(path.absolute())}
+        )
+    )